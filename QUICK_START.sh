@@ -55,7 +55,7 @@ python run_visualization_pipeline.py ~/data/my-comp-abc123/logs --skip-judge --o
 # Step 0: Load Configuration
 #   - Extract competition name from path
 #   - Look up metrics in metrics.csv
-#   - Update journal_viz_.py with correct settings
+#   - Write viz_config.json (read by journal_viz_.py) with correct settings
 
 # Step 1: Judge Journal
 #   - Uses Gemini/GPT to verify code changes match plans
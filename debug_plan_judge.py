@@ -4,10 +4,74 @@ Debug script to check what nodes have multiple children and what's already analy
 Also runs plan_judge.py to see its output.
 """
 
-import json
 import subprocess
+import sys
+import threading
 from pathlib import Path
 
+from json_io import loads_json
+
+# Optional: stream large journals node by node instead of loading them whole
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+def _load_json(path):
+    """Parse a JSON file in one read."""
+    return loads_json(Path(path).read_bytes())
+
+def _load_nodes(path):
+    """Nodes of a journal saved as a plain list or as {"nodes": [...]}."""
+    raw = _load_json(path)
+    if isinstance(raw, dict) and "nodes" in raw:
+        return raw["nodes"]
+    return raw if isinstance(raw, list) else []
+
+def iter_journal_nodes(path):
+    """Yield the nodes of a journal (plain list or {"nodes": [...]}) one at a time."""
+    if ijson is None:
+        yield from _load_nodes(path)
+        return
+    
+    with open(path, 'rb') as f:
+        head = f.read(1024).lstrip()
+        f.seek(0)
+        prefix = 'item' if head.startswith(b'[') else 'nodes.item'
+        count = 0
+        try:
+            for node in ijson.items(f, prefix, use_float=True):
+                yield node
+                count += 1
+        except ijson.JSONError:
+            # ijson rejects NaN metrics, which the stdlib parser accepts; carry on from a full load
+            yield from _load_nodes(path)[count:]
+
+def check_report(when):
+    """Print a summary of plan_redundancy_report.json (called before and after plan_judge)."""
+    print()
+    print("=" * 60)
+    print(f"Checking plan_redundancy_report.json {when} running plan_judge:")
+    print(f"Report path: {example_report}")
+    print(f"Exists: {example_report.exists()}")
+    
+    if not example_report.exists():
+        print("(Does not exist yet)")
+        return
+    
+    report = _load_json(example_report)
+    print(f"Report type: {type(report)}")
+    if isinstance(report, dict):
+        print(f"Report keys/entries: {len(report)}")
+        if report:
+            print("Sample entries:")
+            for node_id in list(report.keys())[:3]:
+                print(f"  - {node_id}: {report[node_id]}")
+        else:
+            print("(Report is empty - no redundancy found)")
+    else:
+        print(f"Report length: {len(report)}")
+
 # Check one example directory
 runs_dir = Path("/Users/ryomitsuhashi/Desktop/Princeton/Research/MLE bench/runs")
 example_journal = runs_dir / "2025-12-17T20-27-55-GMT_run-group_aide/tensorflow2-question-answering_a3cf875b-2303-466b-bd8d-5a2820cd34b3/logs/journal_with_judgements.json"
@@ -22,21 +86,11 @@ print()
 
 # Check journal_with_judgements.json
 if example_journal.exists():
-    with open(example_journal, 'r') as f:
-        data = json.load(f)
-    
-    if isinstance(data, list):
-        nodes = data
-    elif isinstance(data, dict) and "nodes" in data:
-        nodes = data["nodes"]
-    else:
-        nodes = []
-    
-    print(f"Total nodes in journal: {len(nodes)}")
-    
     # Find nodes with multiple children
+    total_nodes = 0
     multi_child_nodes = []
-    for node in nodes:
+    for node in iter_journal_nodes(example_journal):
+        total_nodes += 1
         if isinstance(node, dict) and "id" in node:
             children = node.get("children", [])
             if isinstance(children, list) and len(children) > 1:
@@ -46,6 +100,7 @@ if example_journal.exists():
                     "children": children[:3]  # Show first 3
                 })
     
+    print(f"Total nodes in journal: {total_nodes}")
     print(f"Nodes with multiple children: {len(multi_child_nodes)}")
     if multi_child_nodes:
         print("\nFirst 3 examples:")
@@ -56,25 +111,7 @@ if example_journal.exists():
     else:
         print("  (none found)")
 
-print()
-print("=" * 60)
-print("Checking plan_redundancy_report.json BEFORE running plan_judge:")
-print(f"Report path: {example_report}")
-print(f"Exists: {example_report.exists()}")
-
-if example_report.exists():
-    with open(example_report, 'r') as f:
-        report = json.load(f)
-    
-    print(f"Report type: {type(report)}")
-    if isinstance(report, dict):
-        print(f"Report keys/entries: {len(report)}")
-        if report:
-            print("Sample entries:")
-            for node_id in list(report.keys())[:3]:
-                print(f"  - {node_id}")
-else:
-    print("(Does not exist yet)")
+check_report("BEFORE")
 
 print()
 print("=" * 60)
@@ -85,45 +122,30 @@ plan_judge_script = Path("/Users/ryomitsuhashi/Desktop/Princeton/Research/MLE be
 cmd = ["python", str(plan_judge_script)]
 
 try:
-    result = subprocess.run(
+    # Stream output live instead of buffering the whole transcript
+    with subprocess.Popen(
         cmd,
         cwd=str(logs_dir),
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
         text=True,
-        timeout=300
-    )
-    
-    print("STDOUT:")
-    print(result.stdout)
+        bufsize=1
+    ) as proc:
+        # Keep the old 5-minute limit without blocking the line reader
+        watchdog = threading.Timer(300, proc.kill)
+        watchdog.start()
+        try:
+            print("OUTPUT:")
+            for line in proc.stdout:
+                sys.stdout.write(line)
+            proc.wait()
+        finally:
+            watchdog.cancel()
     
-    if result.stderr:
-        print("\nSTDERR:")
-        print(result.stderr)
-    
-    print(f"\nReturn code: {result.returncode}")
+    print(f"\nReturn code: {proc.returncode}")
 except Exception as e:
     print(f"Error running plan_judge: {e}")
 
-print()
-print("=" * 60)
-print("Checking plan_redundancy_report.json AFTER running plan_judge:")
-print(f"Report path: {example_report}")
-print(f"Exists: {example_report.exists()}")
-
-if example_report.exists():
-    with open(example_report, 'r') as f:
-        report = json.load(f)
-    
-    print(f"Report type: {type(report)}")
-    if isinstance(report, dict):
-        print(f"Report keys/entries: {len(report)}")
-        if report:
-            print("Sample entries:")
-            for node_id in list(report.keys())[:3]:
-                print(f"  - {node_id}: {report[node_id]}")
-        else:
-            print("(Report is empty - no redundancy found)")
-    else:
-        print(f"Report length: {len(report)}")
+check_report("AFTER")
 
 print("=" * 60)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Local sentence embeddings used to pre-filter plan comparisons before asking an LLM.
+
+Requires sentence-transformers (and numpy); without it available() is False and
+callers should skip the pre-filter. Embeddings are cached by sha256(text) in the
+shared llm_cache.py database when that module is importable.
+"""
+
+import os
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    from llm_cache import cache_key, get_cache
+except ImportError:
+    get_cache = None
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+_model = None
+
+def available():
+    return SentenceTransformer is not None
+
+def _get_model():
+    global _model
+    if _model is None:
+        _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+def embed(texts):
+    """Unit-normalized embeddings of texts, shape (len(texts), dim)."""
+    cache = get_cache() if get_cache is not None else None
+    keys = [cache_key("embedding", EMBEDDING_MODEL, t) for t in texts] if cache else [None] * len(texts)
+    vectors = [cache.get(k) if cache else None for k in keys]
+
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        fresh = _get_model().encode([texts[i] for i in missing], normalize_embeddings=True)
+        for i, vec in zip(missing, fresh):
+            vectors[i] = vec.tolist()
+            if cache:
+                cache.put(keys[i], vectors[i])
+    return np.asarray(vectors, dtype=np.float32)
+
+def max_pairwise_similarity(texts):
+    """Highest cosine similarity between any two distinct texts."""
+    if len(texts) < 2:
+        return 0.0
+    E = embed(texts)
+    S = E @ E.T
+    np.fill_diagonal(S, -1.0)
+    return float(S.max())
@@ -7,41 +7,67 @@ Usage:
     python fix_judgment_errors.py /path/to/journal_with_judgements.json
 """
 
-import json
+import asyncio
+import hashlib
+import mmap
+import re
+import shutil
 import sys
 import os
-import difflib
+import random
 import time
 from pathlib import Path
 
 # Import LLM functions from judge_journal
 sys.path.insert(0, str(Path(__file__).parent))
 try:
-    from judge_journal import get_llm_response
+    from judge_journal import LLM_MAX_OUTPUT_TOKENS, compute_diff, get_llm_response, truncate_diff
 except ImportError:
     print("✗ Cannot import judge_journal module")
     sys.exit(1)
+from json_io import dumps_indented, parse_json
+from llm_cache import get_cache
+
+# Optional: stream large journals node by node instead of loading them whole
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Maximum number of re-judge requests in flight at once
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+
+# Rate-limit backoff: delay = min(LLM_BASE_DELAY * 2**attempt + jitter, LLM_MAX_DELAY)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BASE_DELAY = float(os.getenv("LLM_BASE_DELAY", 1.0))
+LLM_MAX_DELAY = float(os.getenv("LLM_MAX_DELAY", 60.0))
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before retry `attempt`, preferring the provider's Retry-After hint."""
+    if retry_after:
+        return min(retry_after, LLM_MAX_DELAY)
+    return min(LLM_BASE_DELAY * (2 ** attempt) + random.uniform(0, 1), LLM_MAX_DELAY)
 
 # Retry logic for rate limits
-def get_llm_response_with_retry(sys_p, usr_p, max_retries=3):
+def get_llm_response_with_retry(sys_p, usr_p, max_retries=LLM_MAX_RETRIES, max_output_tokens=LLM_MAX_OUTPUT_TOKENS):
     """Call LLM with exponential backoff on 429 errors."""
     for attempt in range(max_retries):
         try:
-            result = get_llm_response(sys_p, usr_p)
+            result = get_llm_response(sys_p, usr_p, max_output_tokens=max_output_tokens)
             
             # Check if we got a rate limit error
             if isinstance(result, dict) and result.get("status") == "error":
                 if "429" in result.get("reason", ""):
-                    wait_time = 2 ** attempt  # 1s, 2s, 4s
-                    print(f"  ⚠ Rate limit (429), waiting {wait_time}s before retry...")
+                    wait_time = backoff_delay(attempt, result.get("retry_after"))
+                    print(f"  ⚠ Rate limit (429), waiting {wait_time:.1f}s before retry...")
                     time.sleep(wait_time)
                     continue
             
             return result
         except Exception as e:
             if "429" in str(e) and attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"  ⚠ Rate limit error, waiting {wait_time}s before retry...")
+                wait_time = backoff_delay(attempt)
+                print(f"  ⚠ Rate limit error, waiting {wait_time:.1f}s before retry...")
                 time.sleep(wait_time)
                 continue
             raise
@@ -49,59 +75,297 @@ def get_llm_response_with_retry(sys_p, usr_p, max_retries=3):
     return {"status": "error", "reason": "Max retries exceeded for rate limit"}
 
 def load_journal(journal_path):
-    """Load journal file."""
-    with open(journal_path, 'r') as f:
-        raw_data = json.load(f)
+    """Load journal file. Returns (nodes, raw_data, orjson_ok); see parse_json."""
+    with open(journal_path, 'rb') as f:
+        raw_data, orjson_ok = parse_json(f.read())
     
     if isinstance(raw_data, dict) and "nodes" in raw_data:
-        return raw_data["nodes"], raw_data
+        return raw_data["nodes"], raw_data, orjson_ok
     elif isinstance(raw_data, list):
-        return raw_data, {"nodes": raw_data}
+        return raw_data, {"nodes": raw_data}, orjson_ok
     else:
         raise ValueError("Unknown JSON structure")
 
-def identify_error_entries(nodes):
-    """Identify entries with judgment errors (status == "error")."""
-    error_indices = []
+def iter_nodes(journal_path, stream=True):
+    """
+    Yield journal nodes one at a time.
+    Streams with ijson when it is installed and stream is set; otherwise falls back to load_journal.
+    """
+    if ijson is None or not stream:
+        nodes, _, _ = load_journal(journal_path)
+        yield from nodes
+        return
     
+    with open(journal_path, 'rb') as f:
+        head = f.read(1024).lstrip()
+        f.seek(0)
+        prefix = 'item' if head.startswith(b'[') else 'nodes.item'
+        yield from ijson.items(f, prefix, use_float=True)
+
+def _is_stream_error(e):
+    """ijson rejects NaN metrics, which the stdlib parser accepts."""
+    return ijson is not None and isinstance(e, ijson.JSONError)
+
+def find_error_entries(journal_path):
+    """identify_error_entries over the journal, streamed unless the journal needs the stdlib parser."""
+    try:
+        return list(identify_error_entries(iter_nodes(journal_path)))
+    except Exception as e:
+        if _is_stream_error(e):
+            return list(identify_error_entries(iter_nodes(journal_path, stream=False)))
+        raise
+
+def identify_error_entries(nodes):
+    """
+    Identify entries with judgment errors (status == "error").
+    Yields (idx, reason, node, prev_code) so `nodes` can be a stream: only the
+    previous node's code is kept around, not the whole journal.
+    """
+    prev_code = None
     for i, node in enumerate(nodes):
         judgment = node.get("llm_judgment", {})
         if isinstance(judgment, dict) and judgment.get("status") == "error":
             reason = judgment.get("reason", "unknown error")
-            error_indices.append((i, reason))
-    
-    return error_indices
+            yield i, reason, node, prev_code
+        prev_code = node.get('code', '')
 
-def rejudge_entry(node, prev_code=None):
+def write_nodes(src_path, dest_path, updates):
     """
-    Re-judge a single entry using the LLM.
-    Returns the judgment result.
+    Write the journal at src_path to dest_path as a list (indent=2), replacing the
+    llm_judgment of nodes whose index is in `updates`. Nodes are re-streamed from
+    src_path, so the full journal is never held in memory (unless only the stdlib
+    parser can read it).
+    """
+    try:
+        _write_nodes(iter_nodes(src_path), dest_path, updates)
+    except Exception as e:
+        if not _is_stream_error(e):
+            raise
+        # Written with stdlib json too if that is what it took to read (NaN metrics)
+        nodes, _, orjson_ok = load_journal(src_path)
+        _write_nodes(nodes, dest_path, updates, use_orjson=orjson_ok)
+
+def _write_nodes(nodes, dest_path, updates, use_orjson=True):
+    tmp_path = f"{dest_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b"[")
+        count = 0
+        for i, node in enumerate(nodes):
+            if i in updates:
+                node["llm_judgment"] = updates[i]
+            f.write(b",\n  " if count else b"\n  ")
+            f.write(dumps_indented(node, use_orjson).replace(b"\n", b"\n  "))
+            count += 1
+        f.write(b"\n]" if count else b"]")
+    os.replace(tmp_path, dest_path)
+
+# Strings (with escapes) and structural brackets; everything else is skipped
+_JSON_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+_WS_COLON = re.compile(rb'\s*:\s*')
+
+def find_judgment_spans(mm, wanted):
+    """
+    Scan a list-format journal buffer and return {idx: (key_pos, start, end)} giving
+    the byte range of each wanted node's llm_judgment object. Stops once the last
+    wanted index has been passed.
+    """
+    spans = {}
+    last = max(wanted)
+    depth = 0
+    idx = -1
+    value_start = None
+    for m in _JSON_TOKEN.finditer(mm):
+        start, end = m.span()
+        ch = mm[start:start + 1]
+        if ch == b'"':
+            if (depth == 2 and idx in wanted and end - start == 14
+                    and mm[start:end] == b'"llm_judgment"'):
+                colon = _WS_COLON.match(mm, end)
+                if colon and mm[colon.end():colon.end() + 1] == b'{':
+                    spans[idx] = (start, colon.end(), None)
+        elif ch in (b'{', b'['):
+            if depth == 1 and ch == b'{':
+                idx += 1
+                if idx > last:
+                    break
+            if depth == 2 and idx in spans and spans[idx][1] == start:
+                value_start = start
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 2 and value_start is not None:
+                spans[idx] = (spans[idx][0], value_start, end)
+                value_start = None
+    return {i: span for i, span in spans.items() if span[2] is not None}
+
+def patch_judgments_in_place(path, updates):
+    """
+    Overwrite only the llm_judgment objects of updated nodes, padding with spaces.
+    The spans are written one by one, so only use this on a copy of a journal.
+    Returns False without touching the file when that is not possible (dict-format
+    journal, missing judgment object, or a new judgment longer than the old one);
+    the caller then falls back to write_nodes.
+    """
+    if not updates:
+        return True
+    with open(path, 'r+b') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0) as mm:
+            if mm[:64].lstrip()[:1] != b'[':
+                return False
+            spans = find_judgment_spans(mm, set(updates))
+            if len(spans) != len(updates):
+                return False
+            
+            patches = []
+            for idx, (key_pos, start, end) in spans.items():
+                line_start = mm.rfind(b'\n', 0, key_pos) + 1
+                indent = mm[line_start:key_pos]
+                if indent.strip():
+                    indent = b''
+                # Judgments come from stdlib-parsed LLM replies; keep any non-finite floats as such
+                new = dumps_indented(updates[idx], use_orjson=False).replace(b'\n', b'\n' + indent)
+                if len(new) > end - start:
+                    return False
+                patches.append((start, end, new))
+            
+            for start, end, new in patches:
+                mm[start:end] = new.ljust(end - start)
+            mm.flush()
+    return True
+
+JUDGE_SYS_PROMPT = "You are a senior code reviewer. Verify if the code changes strictly implement the user's plan."
+
+# Number of (plan, diff) pairs packed into one request, and the per-item diff budget inside it
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 8))
+BATCH_DIFF_CHARS = 4000
+
+def judgement_cache_key(plan, diff):
+    """
+    llm_cache key of one (plan, diff) verdict. get_llm_response's own key covers the whole
+    batched prompt, which differs with every batch an item lands in.
+    """
+    return hashlib.blake2b(f"{JUDGE_SYS_PROMPT}|{plan}|{diff}".encode(), digest_size=16).hexdigest()
+
+def store_judgment(plan, diff, judgment):
+    # Never cache failures, they are exactly what this script is meant to retry
+    if isinstance(judgment, dict) and judgment.get("status") != "error":
+        get_cache().put(judgement_cache_key(plan, diff), judgment)
+
+def prepare_entry(node, prev_code=None):
+    """
+    Compute the (plan, diff) pair to judge for a node.
+    Returns (judgment, None) when no API call is needed (skipped or cached),
+    otherwise (None, (plan, diff)).
     """
     curr_code = node.get('code', '')
     plan = node.get('plan', '')
     
     # Compute Diff
-    diff = "\n".join(difflib.unified_diff(
-        (prev_code or "").splitlines(), 
-        curr_code.splitlines(), 
-        lineterm=""
-    ))
+    diff = compute_diff((prev_code or "").splitlines(), curr_code.splitlines())
     
     # Skip if no meaningful changes
     if not diff.strip() or not plan.strip():
-        return {"status": "skipped", "reason": "No meaningful code changes or plan."}
+        return {"status": "skipped", "reason": "No meaningful code changes or plan."}, None
     
-    # Call API with retry logic
-    if len(diff) > 15000:
-        diff = diff[:15000] + "\n...[Diff Truncated]"
+    diff = truncate_diff(diff)
     
-    sys_p = "You are a senior code reviewer. Verify if the code changes strictly implement the user's plan."
+    cached = get_cache().get(judgement_cache_key(plan, diff))
+    if cached is not None:
+        return cached, None
+    
+    return None, (plan, diff)
+
+def judge_single(plan, diff):
+    """Judge one (plan, diff) pair with its own request."""
     usr_p = f"PLAN:\n{plan}\n\nCODE DIFF:\n{diff}\n\nRespond with JSON: {{ 'status': 'aligned'|'partial'|'deviated', 'reason': 'concise explanation' }}"
+    judgment = get_llm_response_with_retry(JUDGE_SYS_PROMPT, usr_p)
+    store_judgment(plan, diff, judgment)
+    return judgment
+
+def judge_batch(items):
+    """
+    Judge several (plan, diff) pairs with a single request.
+    Falls back to one request per item if the response is not a verdict per item.
+    """
+    if len(items) == 1:
+        return [judge_single(*items[0])]
     
-    judgment = get_llm_response_with_retry(sys_p, usr_p)
-    time.sleep(2)  # Longer delay to avoid rate limits
+    blocks = []
+    for i, (plan, diff) in enumerate(items, 1):
+        diff = truncate_diff(diff, BATCH_DIFF_CHARS)
+        blocks.append(f"[ITEM {i}]\nPLAN:\n{plan}\n\nCODE DIFF:\n{diff}")
     
-    return judgment
+    usr_p = (
+        f"Judge each of the following {len(items)} (plan, diff) pairs independently.\n\n"
+        + "\n\n".join(blocks)
+        + "\n\nRespond with JSON: { 'verdicts': [ { 'status': 'aligned'|'partial'|'deviated', 'reason': 'concise explanation' }, ... ] }"
+        + f" containing exactly {len(items)} verdicts in item order."
+    )
+    # One verdict's worth of output budget per item
+    result = get_llm_response_with_retry(
+        JUDGE_SYS_PROMPT, usr_p, max_output_tokens=LLM_MAX_OUTPUT_TOKENS * len(items)
+    )
+    
+    # An API failure applies to the whole batch; retrying item by item would only multiply 429s
+    if isinstance(result, dict) and result.get("status") == "error":
+        return [result] * len(items)
+    
+    verdicts = result.get("verdicts") if isinstance(result, dict) else result
+    if not (isinstance(verdicts, list) and len(verdicts) == len(items)
+            and all(isinstance(v, dict) and "status" in v for v in verdicts)):
+        return [judge_single(plan, diff) for plan, diff in items]
+    
+    for (plan, diff), verdict in zip(items, verdicts):
+        store_judgment(plan, diff, verdict)
+    return verdicts
+
+def rejudge_entry(node, prev_code=None):
+    """
+    Re-judge a single entry using the LLM.
+    Returns the judgment result.
+    """
+    judgment, item = prepare_entry(node, prev_code)
+    if judgment is not None:
+        return judgment
+    return judge_single(*item)
+
+async def judge_batch_async(items, sem):
+    """
+    Judge a batch without blocking the event loop.
+    The semaphore bounds how many requests are in flight at once.
+    """
+    async with sem:
+        return await asyncio.to_thread(judge_batch, items)
+
+async def rejudge_all(entries):
+    """
+    Re-judge (node, prev_code) pairs concurrently in batches, preserving input order.
+    Cached items never reach the API, and identical (plan, diff) items are judged once.
+    """
+    results = [None] * len(entries)
+    pending = {}  # (plan, diff) -> positions in entries
+    for pos, (node, prev_code) in enumerate(entries):
+        judgment, item = prepare_entry(node, prev_code)
+        if judgment is not None:
+            results[pos] = judgment
+        else:
+            pending.setdefault(item, []).append(pos)
+    
+    items = list(pending)
+    batches = [items[i:i + LLM_BATCH_SIZE] for i in range(0, len(items), LLM_BATCH_SIZE)]
+    sem = asyncio.Semaphore(LLM_CONCURRENCY)
+    outcomes = await asyncio.gather(
+        *(judge_batch_async(batch, sem) for batch in batches),
+        return_exceptions=True
+    )
+    
+    for batch, outcome in zip(batches, outcomes):
+        for k, item in enumerate(batch):
+            for pos in pending[item]:
+                results[pos] = outcome if isinstance(outcome, Exception) else outcome[k]
+    return results
 
 def main():
     if len(sys.argv) < 2:
@@ -115,53 +379,49 @@ def main():
         sys.exit(1)
     
     print(f"Analyzing {journal_path}...")
-    nodes, raw_data = load_journal(journal_path)
-    error_indices = identify_error_entries(nodes)
+    error_entries = find_error_entries(journal_path)
     
-    if not error_indices:
+    if not error_entries:
         print(f"✓ No errors found in {journal_path}")
         return
     
-    print(f"\nFound {len(error_indices)} entries with errors:")
-    for idx, reason in error_indices[:5]:
-        step = nodes[idx].get("step", "?")
+    print(f"\nFound {len(error_entries)} entries with errors:")
+    for idx, reason, node, _ in error_entries[:5]:
+        step = node.get("step", "?")
         reason_short = reason[:80] + "..." if len(reason) > 80 else reason
         print(f"  - Entry {idx} (step {step}): {reason_short}")
     
-    if len(error_indices) > 5:
-        print(f"  ... and {len(error_indices) - 5} more")
+    if len(error_entries) > 5:
+        print(f"  ... and {len(error_entries) - 5} more")
     
     # Re-judge error entries
-    print(f"\nRe-judging {len(error_indices)} error entries...")
+    print(f"\nRe-judging {len(error_entries)} error entries (batch size {LLM_BATCH_SIZE}, concurrency {LLM_CONCURRENCY})...")
     fixed_count = 0
     failed_count = 0
+    updates = {}
     
-    # Build previous code map for context
-    prev_codes = {}
-    for i in range(len(nodes)):
-        prev_codes[i] = nodes[i-1].get('code', '') if i > 0 else None
+    entries = [(node, prev_code) for _, _, node, prev_code in error_entries]
+    results = asyncio.run(rejudge_all(entries))
     
-    for idx, _ in error_indices:
-        try:
-            step_num = nodes[idx].get("step", idx)
-            print(f"  [{fixed_count + 1}/{len(error_indices)}] Judging step {step_num}...", end=" ", flush=True)
-            
-            new_judgment = rejudge_entry(nodes[idx], prev_codes[idx])
-            nodes[idx]["llm_judgment"] = new_judgment
-            
-            status = new_judgment.get("status", "unknown")
-            
-            # Only count as fixed if status is NOT "error"
-            if status == "error":
-                print(f"[{status.upper()}] ✗ Still has error")
-                failed_count += 1
-            else:
-                print(f"[{status.upper()}] ✓")
-                fixed_count += 1
-            
-        except Exception as e:
-            print(f"✗ Failed: {e}")
+    for n, ((idx, _, node, _), new_judgment) in enumerate(zip(error_entries, results), 1):
+        step_num = node.get("step", idx)
+        print(f"  [{n}/{len(error_entries)}] Step {step_num}:", end=" ")
+        
+        if isinstance(new_judgment, Exception):
+            print(f"✗ Failed: {new_judgment}")
+            failed_count += 1
+            continue
+        
+        updates[idx] = new_judgment
+        status = new_judgment.get("status", "unknown")
+        
+        # Only count as fixed if status is NOT "error"
+        if status == "error":
+            print(f"[{status.upper()}] ✗ Still has error")
             failed_count += 1
+        else:
+            print(f"[{status.upper()}] ✓")
+            fixed_count += 1
     
     if fixed_count == 0:
         print(f"\n✗ Failed to fix any entries")
@@ -170,17 +430,25 @@ def main():
     # Only auto-replace if all fixed entries succeeded (no failed ones)
     if failed_count > 0:
         fixed_path = str(journal_path).replace(".json", "_fixed.json")
-        with open(fixed_path, 'w') as f:
-            json.dump(nodes, f, indent=2)
+        shutil.copyfile(journal_path, fixed_path)
+        if not patch_judgments_in_place(fixed_path, updates):
+            write_nodes(journal_path, fixed_path, updates)
         
         print(f"\n⚠ Fixed {fixed_count} entries but {failed_count} still have errors")
         print(f"⚠ Saved to: {fixed_path}")
         print(f"Review before applying: mv {fixed_path} {journal_path}")
         return False
     else:
-        # All entries successfully fixed - replace original (always save as list)
-        with open(journal_path, 'w') as f:
-            json.dump(nodes, f, indent=2)
+        # All entries successfully fixed - patch a copy of the original when the new
+        # judgments fit, otherwise rewrite it (always saved as a list). Either way the
+        # result is renamed over the original, so a crash never leaves a torn journal
+        tmp_path = f"{journal_path}.tmp"
+        shutil.copyfile(journal_path, tmp_path)
+        if patch_judgments_in_place(tmp_path, updates):
+            os.replace(tmp_path, journal_path)
+        else:
+            os.remove(tmp_path)
+            write_nodes(journal_path, journal_path, updates)
         
         print(f"\n✓ Successfully fixed all {fixed_count} error entries")
         print(f"✓ Updated: {journal_path}")
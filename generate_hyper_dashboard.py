@@ -10,39 +10,48 @@ Output:
     Creates ../runs/hyper_dashboard.html
 """
 
+import io
 import os
 import json
 from pathlib import Path
 from datetime import datetime
+from html import escape
+from concurrent.futures import ThreadPoolExecutor
+
+VIZ_FILENAME = 'journal_viz_tree_dashboard.html'
+
+def _scan_run_dir(run_dir, runs_dir):
+    """Collect visualization entries below one top-level date_run directory."""
+    results = []
+    for viz_path in run_dir.rglob(VIZ_FILENAME):
+        rel = viz_path.relative_to(runs_dir)
+        parts = rel.parts
+        if len(parts) >= 3:
+            results.append({
+                'rel_path': str(rel),
+                'date_run': parts[0],  # e.g., 2026-02-03T06-58-07-GMT_run-group_aide
+                'competition_id': parts[1],  # e.g., competition_abc123
+                'abs_path': str(viz_path),
+                '_mtime': viz_path.stat().st_mtime
+            })
+    return results
 
 def find_visualization_files(runs_dir):
     """Find all journal_viz_tree_dashboard.html files under runs_dir."""
+    runs_dir = Path(runs_dir)
+    run_dirs = [d for d in runs_dir.iterdir() if d.is_dir()]
+
+    # Directory reads are I/O bound, so top-level run dirs are scanned in parallel.
     results = []
-    
-    for root, dirs, files in os.walk(runs_dir):
-        if 'journal_viz_tree_dashboard.html' in files:
-            viz_path = os.path.join(root, 'journal_viz_tree_dashboard.html')
-            rel_path = os.path.relpath(viz_path, runs_dir)
-            
-            # Extract run info from path structure
-            parts = rel_path.split(os.sep)
-            if len(parts) >= 3:
-                date_run = parts[0]  # e.g., 2026-02-03T06-58-07-GMT_run-group_aide
-                competition_id = parts[1]  # e.g., competition_abc123
-                
-                results.append({
-                    'rel_path': rel_path,
-                    'date_run': date_run,
-                    'competition_id': competition_id,
-                    'abs_path': viz_path
-                })
-    
-    return sorted(results, key=lambda x: x['date_run'], reverse=True)
+    with ThreadPoolExecutor(max_workers=min(8, len(run_dirs) or 1)) as pool:
+        for found in pool.map(lambda d: _scan_run_dir(d, runs_dir), run_dirs):
+            results.extend(found)
 
-def generate_html(viz_files):
-    """Generate HTML dashboard with links to all visualizations."""
-    
-    html = f"""<!DOCTYPE html>
+    # Newest first by file mtime, so order is right even for non-timestamped run dirs
+    results.sort(key=lambda x: x['_mtime'], reverse=True)
+    return results
+
+HEADER_TMPL = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -228,11 +237,11 @@ def generate_html(viz_files):
             
             <div class="stats">
                 <div class="stat">
-                    <span class="stat-number">{len(viz_files)}</span>
+                    <span class="stat-number">{n}</span>
                     <span class="stat-label">Visualizations</span>
                 </div>
                 <div class="stat">
-                    <span class="stat-number">{len(set(v['date_run'] for v in viz_files))}</span>
+                    <span class="stat-number">{dates}</span>
                     <span class="stat-label">Run Dates</span>
                 </div>
             </div>
@@ -248,7 +257,9 @@ def generate_html(viz_files):
         </header>
         
         <div id="cardsContainer" class="grid">
-            {''.join(generate_card_html(v) for v in viz_files)}
+            """
+
+FOOTER_TMPL = """
         </div>
         
         <div id="emptyState" class="empty-state hidden">
@@ -258,24 +269,31 @@ def generate_html(viz_files):
     </div>
     
     <footer>
-        Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} • MLE Bench Visualization Suite
+        Generated on {ts} • MLE Bench Visualization Suite
     </footer>
     
     <script>
+        // Lowercased search keys are prebuilt in data-search; collect them once
+        let searchIndex = null;
+        document.addEventListener('DOMContentLoaded', () => {{
+            searchIndex = Array.from(document.querySelectorAll('.card'), el => ({{ el, search: el.dataset.search }}));
+        }});
+        
         function filterCards() {{
             const searchInput = document.getElementById('searchInput').value.toLowerCase();
-            const cards = document.querySelectorAll('.card');
+            if (!searchIndex) {{
+                searchIndex = Array.from(document.querySelectorAll('.card'), el => ({{ el, search: el.dataset.search }}));
+            }}
             let visibleCount = 0;
             
-            cards.forEach(card => {{
-                const text = card.textContent.toLowerCase();
-                if (text.includes(searchInput)) {{
-                    card.classList.remove('hidden');
+            for (const {{ el, search }} of searchIndex) {{
+                if (search.includes(searchInput)) {{
+                    el.classList.remove('hidden');
                     visibleCount++;
                 }} else {{
-                    card.classList.add('hidden');
+                    el.classList.add('hidden');
                 }}
-            }});
+            }}
             
             // Show empty state if no cards visible
             const emptyState = document.getElementById('emptyState');
@@ -289,25 +307,48 @@ def generate_html(viz_files):
 </body>
 </html>
 """
-    
-    return html
 
-def generate_card_html(viz_file):
-    """Generate a card HTML for a single visualization file."""
-    
-    # Parse date for display
-    date_str = viz_file['date_run'].split('T')[0] if 'T' in viz_file['date_run'] else viz_file['date_run']
-    
-    return f"""        <div class="card">
-            <div class="card-date">{date_str}</div>
-            <div class="card-title">{viz_file['competition_id']}</div>
-            <a href="{viz_file['rel_path'].replace(os.sep, '/')}" class="card-link" target="_blank">
+CARD_TMPL = """        <div class="card" data-search="{_search}">
+            <div class="card-date">{_date}</div>
+            <div class="card-title">{competition_id}</div>
+            <a href="{_url}" class="card-link" target="_blank">
                 View Visualization →
             </a>
-            <div class="card-path">{viz_file['rel_path']}</div>
+            <div class="card-path">{rel_path}</div>
         </div>
 """
 
+def annotate_viz_file(v):
+    """Precompute the URL, display date and search key used by CARD_TMPL."""
+    v['_url'] = v['rel_path'].replace(os.sep, '/')
+    v['_date'] = v['date_run'].split('T', 1)[0]
+    v['_search'] = escape(f"{v['_date']} {v['competition_id']} {v['rel_path']}".lower())
+    return v
+
+def generate_cards_html(viz_files):
+    """Render all cards in one pass from CARD_TMPL."""
+    return "".join([CARD_TMPL.format_map(annotate_viz_file(v)) for v in viz_files])
+
+def generate_card_html(viz_file):
+    """Generate a card HTML for a single visualization file."""
+    return generate_cards_html([viz_file])
+
+def write_html(f, viz_files):
+    """Stream the dashboard to an open text file, one card at a time."""
+    f.write(HEADER_TMPL.format(
+        n=len(viz_files),
+        dates=len(set(v['date_run'] for v in viz_files))
+    ))
+    for v in viz_files:
+        f.write(CARD_TMPL.format_map(annotate_viz_file(v)))
+    f.write(FOOTER_TMPL.format(ts=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+def generate_html(viz_files):
+    """Generate HTML dashboard with links to all visualizations."""
+    buf = io.StringIO()
+    write_html(buf, viz_files)
+    return buf.getvalue()
+
 def main():
     # Determine paths
     script_dir = Path(__file__).resolve().parent
@@ -329,13 +370,10 @@ def main():
     
     print(f"Found {len(viz_files)} visualization files")
     
-    # Generate HTML
-    html_content = generate_html(viz_files)
-    
-    # Write to output file
+    # Stream HTML straight to the output file
     try:
-        with open(output_file, 'w') as f:
-            f.write(html_content)
+        with open(output_file, 'w', buffering=1 << 20) as f:
+            write_html(f, viz_files)
         
         print(f"✓ Dashboard generated: {output_file}")
         print(f"  Open in browser: file://{output_file}")
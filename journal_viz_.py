@@ -2,7 +2,14 @@ import os
 import json
 import ast
 import difflib
-from collections import defaultdict
+import functools
+import gzip
+import hashlib
+import math
+from html import escape
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 
 # --- CONFIGURATION ---
@@ -29,16 +36,51 @@ IGNORE_BUGGY_WITHOUT_METRIC = False
 
 DEFAULT_BUGGY_METRIC = -0.1
 
+# Per-run overrides of the settings above, written by run_visualization_pipeline.py
+# (path in $VIZ_CONFIG, else viz_config.json in the current directory)
+VIZ_CONFIG_FILE = os.getenv("VIZ_CONFIG", "viz_config.json")
+if os.path.exists(VIZ_CONFIG_FILE):
+    with open(VIZ_CONFIG_FILE, encoding="utf-8") as _f:
+        _viz_config = json.load(_f)
+    for _key in ("OUTPUT_FILE", "COMPETITION_NAME", "METRIC_INFO", "IGNORE_BUGGY_WITHOUT_METRIC", "DEFAULT_BUGGY_METRIC"):
+        if _key in _viz_config:
+            globals()[_key] = _viz_config[_key]
+
+# Checkout containing mle-bench-fork/, used to find competition descriptions
+MLE_BENCH_ROOT = os.getenv("MLE_BENCH_ROOT", "/Users/ryomitsuhashi/Desktop/Princeton/Research/MLE bench")
+
 # ==========================================
 # 1. LOGIC & DIFF UTILS
 # ==========================================
+def _feed_ast(node, h):
+    """Feed a structural encoding of node (same information as ast.dump) into hash h."""
+    if isinstance(node, ast.AST):
+        h.update(type(node).__name__.encode())
+        h.update(b"(")
+        for field in node._fields:
+            _feed_ast(getattr(node, field, None), h)
+            h.update(b",")
+        h.update(b")")
+    elif isinstance(node, list):
+        h.update(b"[")
+        for item in node:
+            _feed_ast(item, h)
+            h.update(b",")
+        h.update(b"]")
+    else:
+        h.update(repr(node).encode())
+
+@functools.lru_cache(maxsize=4096)
 def get_ast_logic(code_str):
+    """16-byte digest of the code's AST (formatting/comments ignored); raw-code digest if it doesn't parse."""
+    h = hashlib.blake2b(digest_size=16)
     try:
-        tree = ast.parse(code_str)
-        return ast.dump(tree, annotate_fields=False)
+        _feed_ast(ast.parse(code_str), h)
     except:
-        return code_str
+        h = hashlib.blake2b(str(code_str).encode(), digest_size=16)
+    return h.digest()
 
+@functools.lru_cache(maxsize=64)
 def load_competition_description(competition_name):
     """
     Load the competition description from ../mle-bench-fork/mlebench/competitions/{competition_name}/description.md
@@ -52,7 +94,7 @@ def load_competition_description(competition_name):
         current_dir = Path.cwd()
         possible_paths = [
             current_dir.parent.parent / "mle-bench-fork" / "mlebench" / "competitions" / competition_name / "description.md",
-            Path("/Users/ryomitsuhashi/Desktop/Princeton/Research/MLE bench/mle-bench-fork/mlebench/competitions") / competition_name / "description.md",
+            Path(MLE_BENCH_ROOT) / "mle-bench-fork" / "mlebench" / "competitions" / competition_name / "description.md",
         ]
         
         for desc_path in possible_paths:
@@ -64,57 +106,85 @@ def load_competition_description(competition_name):
     except Exception as e:
         return ""
 
+# Below this many sibling sets, process start-up costs more than the parsing it saves.
+PARALLEL_REDUNDANCY_MIN_BUCKETS = 64
+
+def _analyze_bucket(bucket):
+    """Group one parent's children by normalized AST; returns (pid, duplicates_or_None)."""
+    pid, children = bucket
+    codes = [code for _, code in children]
+    # Byte-identical siblings (retries) need no parsing at all.
+    if len(set(codes)) == 1:
+        return pid, [[cid for cid, _ in children]]
+    groups = defaultdict(list)
+    for cid, code in children:
+        groups[get_ast_logic(code)].append(cid)
+    duplicates = [g for g in groups.values() if len(g) > 1]
+    return pid, duplicates or None
+
 def analyze_code_redundancy(nodes):
+    """
+    Group siblings whose code is structurally identical (same AST digest).
+    Linear in the number of nodes: each code body is hashed once and grouped by
+    digest within its parent; there is no pairwise comparison.
+    Returns {parent_id: [[child_id, ...], ...]} for groups of two or more.
+    """
     siblings_map = defaultdict(list)
     for n in nodes:
         pid = n.get('parent_id')
-        if pid and pid != 'SUPER_ROOT':
-            siblings_map[pid].append(n)
-            
-    redundancy_map = {}
-    for pid, children in siblings_map.items():
-        if len(children) < 2: continue
-        groups = defaultdict(list)
-        for child in children:
-            norm = get_ast_logic(child.get('code', ""))
-            groups[norm].append(child['id'])
-        duplicates = [g for g in groups.values() if len(g) > 1]
-        if duplicates: redundancy_map[pid] = duplicates
-    return redundancy_map
+        code = n.get('code') or ""
+        # Planning-only nodes with no code can't be redundant; don't parse them.
+        if pid and pid != 'SUPER_ROOT' and code.strip():
+            siblings_map[pid].append((n['id'], code))
+    buckets = [(pid, children) for pid, children in siblings_map.items() if len(children) >= 2]
+
+    if len(buckets) >= PARALLEL_REDUNDANCY_MIN_BUCKETS:
+        with ProcessPoolExecutor() as ex:
+            results = list(ex.map(_analyze_bucket, buckets, chunksize=8))
+    else:
+        results = map(_analyze_bucket, buckets)
+
+    return {pid: duplicates for pid, duplicates in results if duplicates}
+
+# Below this many distinct code pairs, diffs are computed in-process.
+PARALLEL_DIFF_MIN_NODES = 200
+
+def code_digest(code):
+    """16-byte digest of a code string, cheap to use as a dict key."""
+    return hashlib.blake2b((code or "").encode(), digest_size=16).digest()
+
+EMPTY_DIGEST = code_digest("")
 
 def generate_side_by_side_diff(code_a, code_b):
     if code_a is None: code_a = ""
     if code_b is None: code_b = ""
     lines_a = code_a.splitlines()
     lines_b = code_b.splitlines()
-    diff = list(difflib.ndiff(lines_a, lines_b))
     html_a, html_b = [], []
-    for line in diff:
-        prefix, content = line[:2], line[2:].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-        if prefix == '  ': 
-            html_a.append(f'<div class="diff-row">{content}</div>')
-            html_b.append(f'<div class="diff-row">{content}</div>')
-        elif prefix == '- ': 
-            html_a.append(f'<div class="diff-row diff-removed">{content}</div>')
-            html_b.append('<div class="diff-row empty">&nbsp;</div>')
-        elif prefix == '+ ': 
-            html_a.append('<div class="diff-row empty">&nbsp;</div>')
-            html_b.append(f'<div class="diff-row diff-added">{content}</div>')
+    empty = '<div class="diff-row empty">&nbsp;</div>'
+    sm = difflib.SequenceMatcher(None, lines_a, lines_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        if tag == 'equal':
+            block = "".join(f'<div class="diff-row">{escape(l, quote=False)}</div>' for l in lines_a[i1:i2])
+            html_a.append(block)
+            html_b.append(block)
+            continue
+        # delete / insert / replace: removed lines on the left, added on the right,
+        # padded so both panes keep the same number of rows (same layout as ndiff).
+        removed, added = i2 - i1, j2 - j1
+        html_a.extend(f'<div class="diff-row diff-removed">{escape(l, quote=False)}</div>' for l in lines_a[i1:i2])
+        html_a.append(empty * added)
+        html_b.append(empty * removed)
+        html_b.extend(f'<div class="diff-row diff-added">{escape(l, quote=False)}</div>' for l in lines_b[j1:j2])
     return {'left': "".join(html_a), 'right': "".join(html_b)}
 
 # ==========================================
 # 2. MODULAR HTML PIECES
 # ==========================================
 
-HTML_HEAD = """
-<head>
-    <meta charset="UTF-8">
-    <title>Agent Forest Dashboard</title>
-    <script src="https://d3js.org/d3.v7.min.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/marked/marked.min.js"></script>
-    <style>
-        :root { --bg: #1e1e1e; --panel: #252526; --border: #3e3e42; --text: #d4d4d4; --accent: #007fd4; --valid: #4ec9b0; --buggy: #f48771; --partial: #ce9178; }
+# Shared stylesheet, written once next to the dashboard as dashboard.css
+CSS_FILE = "dashboard.css"
+DASHBOARD_CSS = """        :root { --bg: #1e1e1e; --panel: #252526; --border: #3e3e42; --text: #d4d4d4; --accent: #007fd4; --valid: #4ec9b0; --buggy: #f48771; --partial: #ce9178; }
         * { box-sizing: border-box; }
         body { margin: 0; display: flex; height: 100vh; background: var(--bg); color: var(--text); font-family: 'Segoe UI', sans-serif; overflow: hidden; }
         
@@ -158,6 +228,9 @@ HTML_HEAD = """
 
         details { cursor: pointer; background: #1a1a1a; padding: 10px; border-radius: 4px; border: 1px solid var(--border); }
         pre { color: #9cdcfe; font-family: Consolas, monospace; font-size: 13px; white-space: pre-wrap; word-break: break-all; }
+        .branch-row { padding: 15px; border-bottom: 1px solid var(--border); cursor: pointer; }
+        .branch-row.selected { background: #37373d; }
+        #detail-plan, #detail-analysis { white-space: pre-wrap; }
         .red-group { margin-bottom: 15px; padding: 12px; background: #2d2d30; border-radius: 6px; border-left: 4px solid var(--accent); }
         .badge-id { display: inline-block; padding: 2px 6px; background: #1e1e1e; border: 1px solid #555; border-radius: 4px; margin-right: 5px; font-size: 11px; }
 
@@ -184,7 +257,16 @@ HTML_HEAD = """
         .markdown-content strong { font-weight: 600; }
         .markdown-content em { font-style: italic; }
         .markdown-content hr { background: #3e3e42; border: 0; height: 1px; margin: 24px 0; }
-    </style>
+"""
+
+HTML_HEAD = """
+<head>
+    <meta charset="UTF-8">
+    <title>Agent Forest Dashboard</title>
+    <script src="https://d3js.org/d3.v7.min.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <link rel="preload" href="dashboard.css" as="style" onload="this.rel='stylesheet'">
+    <noscript><link rel="stylesheet" href="dashboard.css"></noscript>
 </head>
 """
 
@@ -247,80 +329,7 @@ BRANCH_PART = """
 # ==========================================
 # 3. MAIN EXECUTION
 # ==========================================
-def main():
-    if not os.path.exists(DATA_FILE):
-        print(f"Error: {DATA_FILE} not found.")
-        return
-
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        if isinstance(data, dict): data = data.get("nodes", [])
-
-    id_to_node = {n['id']: n for n in data}
-    for n in data:
-        # Handle both old format (parent_id) and new format (parent)
-        pid = n.get('parent_id') or n.get('parent')
-        if not pid or pid not in id_to_node: 
-            n['parent_id'] = 'SUPER_ROOT'
-        else:
-            n['parent_id'] = pid
-        p_code = id_to_node.get(n['parent_id'], {}).get('code', "")
-        n['diff_html'] = generate_side_by_side_diff(p_code, n.get('code', ""))
-
-    # Load competition description
-    description = load_competition_description(COMPETITION_NAME)
-    # Escape special JSON characters in description
-    if description:
-        description = (description
-            .replace('\\', '\\\\')  # Escape backslashes first
-            .replace('"', '\\"')     # Escape quotes
-            .replace('\n', '\\n')    # Escape newlines for JSON
-            .replace('\r', '\\r'))   # Escape carriage returns
-    
-    data.insert(0, {"id": "SUPER_ROOT", "parent_id": None, "step": 0, "code": "", "is_buggy": False, "description": description})
-
-    # Redundancy Setup
-    code_red_map = analyze_code_redundancy(data)
-    plan_red_map = {}
-    step_to_id = {str(n['step']): n['id'] for n in data if 'step' in n}
-    if os.path.exists(PLAN_RED_FILE):
-        try:
-            with open(PLAN_RED_FILE, 'r') as f:
-                raw = json.load(f)
-                for pid, groups in raw.items():
-                    plan_red_map[pid] = [[step_to_id.get(str(s), str(s)) for s in g] for g in groups]
-        except: pass
-
-    goal_type = METRIC_INFO.get("GOAL", "maximize").lower()
-    goal_icon = "⬆️" if goal_type == "maximize" else "⬇️"
-    goal_text = "Higher is better" if goal_type == "maximize" else "Lower is better"
-
-    full_html = """<!DOCTYPE html><html lang="en">""" + HTML_HEAD + """
-<body>
-    """ + SIDEBAR_PART + """
-    <div id="drag-handle" class="resizer"></div>
-    <div class="main-content">
-        <div class="tabs">
-            <div class="tab" onclick="switchTab('stats')">📊 Stats</div>
-            <div class="tab active" onclick="switchTab('detail')">📄 Detail</div>
-            <div class="tab" onclick="switchTab('branch')">🌿 Branching</div>
-        </div>
-        """ + STATS_PART + DETAIL_PART + BRANCH_PART + """
-    </div>
-    <script>
-        const stepsData = """ + json.dumps(data) + """;
-        const planRedData = """ + json.dumps(plan_red_map) + """;
-        const codeRedData = """ + json.dumps(code_red_map) + """;
-        const METRIC_NAME = \"""" + METRIC_INFO['NAME'] + """\";
-        const METRIC_DESC = \"""" + METRIC_INFO['DESCRIPTION'] + """\";
-        const GOAL_TYPE = \"""" + goal_type + """\";
-        const GOAL_ICON = \"""" + goal_icon + """\";
-        const GOAL_TEXT = \"""" + goal_text + """\";
-        
-        // --- CONSTANTS ---
-        const CONF_FORCE_DEFAULT = """ + str(FORCE_BUGGY_TO_DEFAULT).lower() + """;
-        const CONF_IGNORE_MISSING = """ + str(IGNORE_BUGGY_WITHOUT_METRIC).lower() + """;
-        const CONF_DEFAULT_VAL = """ + str(DEFAULT_BUGGY_METRIC) + """;
+SCRIPT_PART = """
         
         let treeMap = {};
         stepsData.forEach(s => treeMap[s.id] = s);
@@ -349,58 +358,63 @@ def main():
         }
 
         function initStats() {
-            const realSteps = stepsData.filter(s => s.id !== 'SUPER_ROOT');
-            const metricsOnly = realSteps.map(s => getMetric(s)).filter(v => v !== null);
-            let best = metricsOnly.length > 0 ? (GOAL_TYPE === 'maximize' ? Math.max(...metricsOnly) : Math.min(...metricsOnly)).toFixed(4) : "N/A";
-            document.getElementById('st-total').innerText = realSteps.length;
-            document.getElementById('st-valid').innerText = realSteps.filter(s => !s.is_buggy).length;
-            document.getElementById('st-buggy').innerText = realSteps.filter(s => s.is_buggy).length;
-            document.getElementById('st-best').innerText = best;
-
-            const dataPts = realSteps.map(s => {
-                let val = getMetric(s);
-                // Buggy node handling
-                if (s.is_buggy) {
-                    if (CONF_FORCE_DEFAULT) {
-                        val = CONF_DEFAULT_VAL;
-                    } else if (val === null) {
-                        if (CONF_IGNORE_MISSING) return null;
-                        // Leave val as null (do not set to 0.0 or CONF_DEFAULT_VAL)
-                    }
-                }
-                if (val === null) return null;
-                // --- Pass 'is_buggy' status to the data point ---
-                return {x: s.step, y: val, is_buggy: s.is_buggy};
-            }).filter(d => d !== null).sort((a,b) => a.x - b.x);
+            // Single pass over the steps for every counter and the best metric
+            const maximize = GOAL_TYPE === 'maximize';
+            let total = 0, valid = 0, buggy = 0, bestVal = null;
+            for (const s of stepsData) {
+                if (s.id === 'SUPER_ROOT') continue;
+                total++;
+                if (s.is_buggy) buggy++; else valid++;
+                const v = getMetric(s);
+                if (v !== null && (bestVal === null || (maximize ? v > bestVal : v < bestVal))) bestVal = v;
+            }
+            document.getElementById('st-total').textContent = total;
+            document.getElementById('st-valid').textContent = valid;
+            document.getElementById('st-buggy').textContent = buggy;
+            document.getElementById('st-best').textContent = bestVal === null ? "N/A" : bestVal.toFixed(4);
+
+            // Points are filtered, sorted and flagged in Python (build_chart_data)
+            const dataPts = chartData;
 
             if(dataPts.length > 0) {
-                // --- Generate Color Array ---
-                const pointColors = dataPts.map(d => d.is_buggy ? '#f48771' : '#4ec9b0');
+                // Colour per point from its own is_buggy flag (scriptable), so it stays
+                // correct after decimation drops points.
+                const pointColor = ctx => ctx.raw && ctx.raw.is_buggy ? '#f48771' : '#4ec9b0';
 
                 new Chart(document.getElementById('metricChart'), {
                     type: 'line',
                     data: {
-                        labels: dataPts.map(d => 'Step ' + d.x),
                         datasets: [{ 
                             label: METRIC_NAME, 
-                            data: dataPts.map(d => d.y), 
+                            data: dataPts, 
                             borderColor: '#4ec9b0', 
                             tension: 0.2,
-                            // --- Apply Colors ---
-                            pointBackgroundColor: pointColors,
-                            pointBorderColor: pointColors,
+                            pointBackgroundColor: pointColor,
+                            pointBorderColor: pointColor,
                             pointRadius: 5,
                             pointHoverRadius: 7
                         }]
                     },
                     options: { 
                         maintainAspectRatio: false,
-                        plugins: { subtitle: { display: true, text: [METRIC_DESC, GOAL_ICON + " " + GOAL_TEXT], color: '#aaa', font: { style: 'italic' } } }
+                        // Pre-built {x, y} points: skip Chart.js parsing and let LTTB cap what gets drawn
+                        parsing: false,
+                        normalized: true,
+                        scales: { x: { type: 'linear', ticks: { precision: 0 } } },
+                        plugins: {
+                            decimation: { enabled: true, algorithm: 'lttb', samples: 500, threshold: 500 },
+                            tooltip: { callbacks: { title: items => items.length ? 'Step ' + items[0].parsed.x : '' } },
+                            subtitle: { display: true, text: [METRIC_DESC, GOAL_ICON + " " + GOAL_TEXT], color: '#aaa', font: { style: 'italic' } }
+                        }
                     }
                 });
             }
         }
 
+        // Node id -> <circle>, filled in by initD3 so selection never re-queries the SVG
+        const circleById = new Map();
+        let selectedCircle = null;
+
         function initD3() {
             const stratify = d3.stratify().id(d => d.id).parentId(d => d.parent_id);
             const root = stratify(stepsData);
@@ -418,13 +432,45 @@ def main():
                 .on("click", (e, d) => { selectNode(d.data.id); });
             
             node.append("circle").attr("r", 7);
+            node.each(function(d) { circleById.set(d.data.id, this.querySelector('circle')); });
             node.append("text").attr("dy", -15).attr("text-anchor", "middle").text(d => d.data.id === 'SUPER_ROOT' ? 'START' : "Step " + d.data.step);
         }
 
+        // Sections that only apply to real steps (hidden for SUPER_ROOT); looked up once
+        let NODE_SECTIONS = null;
+        function setNodeSectionsDisplay(display) {
+            if (!NODE_SECTIONS) {
+                NODE_SECTIONS = ['#detail-plan', '#detail-analysis', '#detail-full-code', '.diff-container']
+                    .map(sel => document.querySelector(sel).closest('.section'));
+            }
+            NODE_SECTIONS.forEach(el => { el.style.display = display; });
+        }
+
+        // marked.js is only needed for the START node's description, so it is fetched on first use
+        const MARKED_SRC = "https://cdn.jsdelivr.net/npm/marked/marked.min.js";
+        let markedLoading = null;
+        function loadMarked() {
+            if (window.marked) return Promise.resolve(window.marked);
+            if (!markedLoading) {
+                markedLoading = new Promise((resolve, reject) => {
+                    const script = document.createElement('script');
+                    script.src = MARKED_SRC;
+                    script.onload = () => resolve(window.marked);
+                    script.onerror = () => { markedLoading = null; reject(new Error('Failed to load marked.js')); };
+                    document.head.appendChild(script);
+                });
+            }
+            return markedLoading;
+        }
+
+        let currentNodeId = null;
+
         function selectNode(id) {
             const step = treeMap[id];
-            d3.selectAll(".node circle").style("fill", "");
-            d3.select("#node-"+id+" circle").style("fill", "#fff");
+            currentNodeId = id;
+            if (selectedCircle) selectedCircle.style.fill = "";
+            selectedCircle = circleById.get(id) || null;
+            if (selectedCircle) selectedCircle.style.fill = "#fff";
             
             document.getElementById('empty-state').style.display = 'none';
             document.getElementById('detail-view').style.display = 'block';
@@ -433,32 +479,28 @@ def main():
             if (id === 'SUPER_ROOT') {
                 // Hide all detail sections except description for SUPER_ROOT
                 document.getElementById('detail-stats').style.display = 'none';
-                document.querySelectorAll('div.section').forEach(el => {
-                    if (el.querySelector('#detail-plan') || el.querySelector('#detail-analysis') || 
-                        el.querySelector('#detail-full-code') || el.querySelector('.diff-container')) {
-                        el.style.display = 'none';
-                    }
-                });
+                setNodeSectionsDisplay('none');
                 
                 // Display competition description if available
                 const description = step.description || '';
                 if (description) {
-                    // Unescape JSON-escaped content using simple string replacement
-                    let unescapedDesc = description;
-                    unescapedDesc = unescapedDesc.split('\\\\n').join('\\n');
-                    unescapedDesc = unescapedDesc.split('\\\\r').join('\\r');
-                    unescapedDesc = unescapedDesc.split('\\\\"').join('"');
-                    unescapedDesc = unescapedDesc.split('\\\\\\\\').join('\\\\');
-                    
-                    // Use marked.js to render markdown
-                    const htmlContent = marked.parse(unescapedDesc);
-                    
-                    document.getElementById('detail-verification').style.display = 'block';
-                    document.getElementById('detail-verification').innerHTML = `
+                    const verification = document.getElementById('detail-verification');
+                    verification.style.display = 'block';
+                    verification.innerHTML = `<p style="color: #888; font-style: italic;">Loading description...</p>`;
+                    loadMarked().then(() => {
+                        // The user may have moved on while marked.js was loading
+                        if (currentNodeId !== 'SUPER_ROOT') return;
+                        // Parse once; later visits to START reuse the rendered HTML
+                        if (step._rendered === undefined) step._rendered = marked.parse(description);
+                        verification.innerHTML = `
                         <div class="markdown-content">
-                            ${htmlContent}
+                            ${step._rendered}
                         </div>
                     `;
+                    }).catch(() => {
+                        if (currentNodeId !== 'SUPER_ROOT') return;
+                        verification.textContent = description;
+                    });
                 } else {
                     document.getElementById('detail-verification').style.display = 'block';
                     document.getElementById('detail-verification').innerHTML = `
@@ -473,12 +515,7 @@ def main():
             
             // For regular nodes, show all sections
             document.getElementById('detail-stats').style.display = 'block';
-            document.querySelectorAll('div.section').forEach(el => {
-                if (el.querySelector('#detail-plan') || el.querySelector('#detail-analysis') || 
-                    el.querySelector('#detail-full-code') || el.querySelector('.diff-container')) {
-                    el.style.display = 'block';
-                }
-            });
+            setNodeSectionsDisplay('block');
             document.getElementById('detail-verification').style.display = 'block';
 
             let mVal = getMetric(step);
@@ -493,7 +530,6 @@ def main():
             const statusText = step.is_buggy ? "BUGGY" : "VALID";
             const statusColor = step.is_buggy ? "var(--buggy)" : "var(--valid)";
             
-            document.getElementById('detail-stats').innerHTML = `<div class="metric-card"><label>Step</label><span>${step.step}</span></div><div class="metric-card"><label>Status</label><span style="color:${statusColor}">${statusText}</span></div><div class="metric-card"><label>Exec Time</label><span>${step.exec_time || 'N/A'}s</span></div><div class="metric-card"><label>${METRIC_NAME}</label><span>${Number(mVal).toFixed(4)}</span></div><div class="metric-card"><label>Magnitude</label><span>${step.magnitude || '0'}</span></div>`;
             document.getElementById('detail-stats').innerHTML = `<div class="metric-card"><label>Step</label><span>${step.step}</span></div><div class="metric-card"><label>Status</label><span style="color:${statusColor}">${statusText}</span></div><div class="metric-card"><label>Exec Time</label><span>${step.exec_time || 'N/A'}s</span></div><div class="metric-card"><label>${METRIC_NAME}</label><span>${mVal === 'null' ? 'null' : Number(mVal).toFixed(4)}</span></div><div class="metric-card"><label>Magnitude</label><span>${step.magnitude || '0'}</span></div>`;
 
             document.getElementById('detail-verification').innerHTML = `
@@ -504,29 +540,30 @@ def main():
                 <p style="font-size: 12px; margin-top: 5px;">${jud.reason || 'No reasoning provided.'}</p>
             `;
             
-            document.getElementById('detail-plan').innerText = step.plan || "N/A";
-            document.getElementById('detail-analysis').innerText = step.analysis || "N/A";
-            document.getElementById('detail-full-code').innerText = step.code || "";
-            document.getElementById('diff-left').innerHTML = step.diff_html?.left || "";
-            document.getElementById('diff-right').innerHTML = step.diff_html?.right || "";
+            document.getElementById('detail-plan').textContent = step.plan || "N/A";
+            document.getElementById('detail-analysis').textContent = step.analysis || "N/A";
+            const diff = diffTable[step.diff_idx];
+            document.getElementById('detail-full-code').textContent = codeTable[step.code_idx] || "";
+            document.getElementById('diff-left').innerHTML = diff?.left || "";
+            document.getElementById('diff-right').innerHTML = diff?.right || "";
             switchTab('detail');
         }
 
         function initBranchList() {
-            const counts = {};
-            stepsData.forEach(s => { if(s.parent_id && s.parent_id !== 'SUPER_ROOT') counts[s.parent_id] = (counts[s.parent_id]||0)+1; });
-            const branches = stepsData.filter(s => counts[s.id] > 1).sort((a,b) => a.step - b.step);
+            // branchList (branching steps with their child counts, sorted) comes from build_branch_list
             const list = document.getElementById('branch-list');
-            branches.forEach(s => {
-                const el = document.createElement('div');
-                el.style.cssText = "padding:15px; border-bottom:1px solid var(--border); cursor:pointer;";
-                el.innerHTML = "<strong>Step " + s.step + "</strong> <span style='color:#888; font-size:11px;'>(" + counts[s.id] + " paths)</span>";
-                el.onclick = () => {
-                    document.querySelectorAll('#branch-list div').forEach(i => i.style.background = "transparent");
-                    el.style.background = "#37373d";
-                    showBranchDetail(s.id);
-                };
-                list.appendChild(el);
+            // One innerHTML write and one delegated listener instead of a node + handler per branch
+            list.innerHTML = branchList.map(b =>
+                "<div class='branch-row' data-id='" + b.id + "'><strong>Step " + b.step + "</strong> <span style='color:#888; font-size:11px;'>(" + b.count + " paths)</span></div>"
+            ).join("");
+            let selectedRow = null;
+            list.addEventListener('click', e => {
+                const row = e.target.closest('.branch-row');
+                if (!row) return;
+                if (selectedRow) selectedRow.classList.remove('selected');
+                row.classList.add('selected');
+                selectedRow = row;
+                showBranchDetail(row.dataset.id);
             });
         }
 
@@ -565,12 +602,20 @@ def main():
                 e.preventDefault();
             });
 
+            // Commit at most one width per animation frame instead of one per mouse event
+            let pendingWidth = null;
+            let rafScheduled = false;
             document.addEventListener('mousemove', (e) => {
                 if (!isResizing) return;
                 const newWidth = e.clientX;
-                if (newWidth > 200 && newWidth < 800) {
-                    sidebar.style.width = newWidth + 'px';
-                }
+                if (newWidth <= 200 || newWidth >= 800) return;
+                pendingWidth = newWidth;
+                if (rafScheduled) return;
+                rafScheduled = true;
+                requestAnimationFrame(() => {
+                    rafScheduled = false;
+                    sidebar.style.width = pendingWidth + 'px';
+                });
             });
 
             document.addEventListener('mouseup', () => {
@@ -611,9 +656,220 @@ def main():
     </script>
 </body></html>"""
 
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f: 
-        f.write(full_html)
+def get_metric(node):
+    """Numeric metric of a node (bare number or {"value": number}), else None."""
+    m = node.get('metric')
+    if isinstance(m, dict):
+        m = m.get('value')
+    if isinstance(m, (int, float)) and not isinstance(m, bool) and math.isfinite(m):
+        return m
+    return None
+
+def build_chart_data(nodes):
+    """
+    Metric chart points [{x, y, is_buggy}] sorted by step, applying FORCE_BUGGY_TO_DEFAULT
+    once here instead of in the browser. Nodes without a metric are left out, buggy or
+    not, as the dashboard always did; IGNORE_BUGGY_WITHOUT_METRIC is not consulted.
+    """
+    pts = []
+    for n in nodes:
+        if n['id'] == 'SUPER_ROOT':
+            continue
+        val = get_metric(n)
+        if n.get('is_buggy') and FORCE_BUGGY_TO_DEFAULT:
+            val = DEFAULT_BUGGY_METRIC
+        # Missing metrics are never plotted
+        if val is None:
+            continue
+        pts.append({'x': n.get('step'), 'y': val, 'is_buggy': bool(n.get('is_buggy'))})
+    pts.sort(key=lambda d: (d['x'] is None, d['x'] or 0))
+    return pts
+
+def build_branch_list(nodes):
+    """Steps with more than one child, as [{id, step, count}] sorted by step."""
+    counts = Counter(n['parent_id'] for n in nodes if n.get('parent_id') and n['parent_id'] != 'SUPER_ROOT')
+    branches = [{'id': n['id'], 'step': n.get('step'), 'count': counts[n['id']]} for n in nodes if counts[n['id']] > 1]
+    branches.sort(key=lambda b: (b['step'] is None, b['step'] or 0))
+    return branches
+
+def intern_codes(nodes):
+    """
+    Replace each node's 'code' with 'code_idx' into a table of distinct code bodies,
+    so identical code (retries, no-op steps) is shipped to the browser once.
+    """
+    index = {}
+    for n in nodes:
+        code = n.pop('code', None) or ""
+        n['code_idx'] = index.setdefault(code, len(index))
+    return list(index)
+
+def scrub_nonfinite(obj):
+    """Replace NaN/Infinity floats with None so the payload stays valid for JSON.parse."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: scrub_nonfinite(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [scrub_nonfinite(v) for v in obj]
+    return obj
+
+class TeeWriter:
+    """Minimal file-like object that forwards each write to several files."""
+    def __init__(self, *files):
+        self.files = files
+
+    def write(self, s):
+        for f in self.files:
+            f.write(s)
+
+class ScriptSafeWriter:
+    """
+    File wrapper for JSON embedded in <script type="application/json"> blocks.
+    '<' only occurs inside JSON strings, so writing it as \\u003c keeps the payload
+    valid JSON while making a literal </script> in node data impossible.
+    """
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, s):
+        self.f.write(s.replace("<", "\\u003c"))
+
+def main(compress=False):
+    if not os.path.exists(DATA_FILE):
+        print(f"Error: {DATA_FILE} not found.")
+        return
+
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        if isinstance(data, dict): data = data.get("nodes", [])
+
+    id_to_node = {n['id']: n for n in data}
+    for n in data:
+        # Handle both old format (parent_id) and new format (parent)
+        pid = n.get('parent_id') or n.get('parent')
+        if not pid or pid not in id_to_node: 
+            n['parent_id'] = 'SUPER_ROOT'
+        else:
+            n['parent_id'] = pid
+
+    # Retries and no-op steps repeat the same (parent, child) code pair, so each
+    # distinct pair (keyed by code digests) is diffed once and shared.
+    digest_by_id = {n['id']: code_digest(n.get('code')) for n in data}
+    pair_index = {}
+    pairs = []
+    node_pairs = []
+    for n in data:
+        key = (digest_by_id.get(n['parent_id'], EMPTY_DIGEST), digest_by_id[n['id']])
+        if key not in pair_index:
+            pair_index[key] = len(pairs)
+            pairs.append((id_to_node.get(n['parent_id'], {}).get('code', ""), n.get('code', "")))
+        node_pairs.append(pair_index[key])
+
+    # Diffs are independent and CPU-bound; spread them over cores for big journals
+    parent_codes = [a for a, _ in pairs]
+    child_codes = [b for _, b in pairs]
+    if len(pairs) >= PARALLEL_DIFF_MIN_NODES:
+        with ProcessPoolExecutor() as ex:
+            diffs = list(ex.map(generate_side_by_side_diff, parent_codes, child_codes, chunksize=16))
+    else:
+        diffs = list(map(generate_side_by_side_diff, parent_codes, child_codes))
+    # Nodes point into the shared diff table instead of each carrying a copy
+    for n, i in zip(data, node_pairs):
+        n['diff_idx'] = i
+
+    # Load competition description
+    description = load_competition_description(COMPETITION_NAME)
+    data.insert(0, {"id": "SUPER_ROOT", "parent_id": None, "step": 0, "code": "", "is_buggy": False, "description": description})
+
+    # Redundancy Setup
+    code_red_map = analyze_code_redundancy(data)
+    plan_red_map = {}
+    step_to_id = {str(n['step']): n['id'] for n in data if 'step' in n}
+    if os.path.exists(PLAN_RED_FILE):
+        try:
+            with open(PLAN_RED_FILE, 'r') as f:
+                raw = json.load(f)
+                for pid, groups in raw.items():
+                    plan_red_map[pid] = [[step_to_id.get(str(s), str(s)) for s in g] for g in groups]
+        except: pass
+
+    data = scrub_nonfinite(data)
+    code_table = intern_codes(data)
+    chart_data = build_chart_data(data)
+    branch_list = build_branch_list(data)
+
+    goal_type = METRIC_INFO.get("GOAL", "maximize").lower()
+    goal_icon = "⬆️" if goal_type == "maximize" else "⬇️"
+    goal_text = "Higher is better" if goal_type == "maximize" else "Lower is better"
+
+    parts = [
+        '<!DOCTYPE html><html lang="en">', HTML_HEAD, """
+<body>
+    """, SIDEBAR_PART, """
+    <div id="drag-handle" class="resizer"></div>
+    <div class="main-content">
+        <div class="tabs">
+            <div class="tab" onclick="switchTab('stats')">📊 Stats</div>
+            <div class="tab active" onclick="switchTab('detail')">📄 Detail</div>
+            <div class="tab" onclick="switchTab('branch')">🌿 Branching</div>
+        </div>
+        """, STATS_PART, DETAIL_PART, BRANCH_PART, """
+    </div>
+    <script type="application/json" id="steps-data">""", data, """</script>
+    <script type="application/json" id="code-table">""", code_table, """</script>
+    <script type="application/json" id="diff-table">""", diffs, """</script>
+    <script type="application/json" id="plan-red-data">""", plan_red_map, """</script>
+    <script type="application/json" id="code-red-data">""", code_red_map, """</script>
+    <script type="application/json" id="chart-data">""", chart_data, """</script>
+    <script type="application/json" id="branch-data">""", branch_list, """</script>
+    <script>
+        const readJSON = id => JSON.parse(document.getElementById(id).textContent);
+        const stepsData = readJSON('steps-data');
+        const codeTable = readJSON('code-table');
+        const diffTable = readJSON('diff-table');
+        const planRedData = readJSON('plan-red-data');
+        const codeRedData = readJSON('code-red-data');
+        const chartData = readJSON('chart-data');
+        const branchList = readJSON('branch-data');
+        const METRIC_NAME = \"""", METRIC_INFO['NAME'], """\";
+        const METRIC_DESC = \"""", METRIC_INFO['DESCRIPTION'], """\";
+        const GOAL_TYPE = \"""", goal_type, """\";
+        const GOAL_ICON = \"""", goal_icon, """\";
+        const GOAL_TEXT = \"""", goal_text, """\";""", SCRIPT_PART,
+    ]
+
+    # Stylesheet lives beside the HTML so browsers can cache it across dashboards
+    css_path = os.path.join(os.path.dirname(os.path.abspath(OUTPUT_FILE)), CSS_FILE)
+    try:
+        with open(css_path, 'r', encoding='utf-8') as f:
+            css_current = f.read() == DASHBOARD_CSS
+    except OSError:
+        css_current = False
+    if not css_current:
+        with open(css_path, 'w', encoding='utf-8') as f:
+            f.write(DASHBOARD_CSS)
+
+    # JSON payloads are dumped straight into the file (compact separators) rather
+    # than materialized as strings first.
+    with ExitStack() as stack:
+        f = stack.enter_context(open(OUTPUT_FILE, 'w', encoding='utf-8'))
+        if compress:
+            # Precompressed copy for HTTP serving; the plain file stays for file:// viewing
+            gz = stack.enter_context(gzip.open(OUTPUT_FILE + '.gz', 'wt', encoding='utf-8', compresslevel=6))
+            f = TeeWriter(f, gz)
+        json_out = ScriptSafeWriter(f)
+        for part in parts:
+            if isinstance(part, str):
+                f.write(part)
+            else:
+                json.dump(part, json_out, separators=(',', ':'))
         
     print(f"✅ Dashboard generated: {OUTPUT_FILE}")
-
-if __name__ == "__main__": main()
+    if compress:
+        print(f"✅ Compressed copy: {OUTPUT_FILE}.gz")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate the journal tree dashboard.")
+    parser.add_argument("--compress", action="store_true", help=f"Also write a gzip copy ({OUTPUT_FILE}.gz)")
+    main(compress=parser.parse_args().compress)
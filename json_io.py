@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Journal JSON reading and writing shared by the pipeline scripts.
+
+orjson is used when it is installed, since it parses and serializes large journals much
+faster than stdlib json. It rejects NaN/Infinity metrics, which stdlib json accepts, so
+parse_json reports which parser was needed and dumps_indented writes such data back with
+stdlib json rather than turning those values into null.
+
+    from json_io import parse_json, dumps_indented, write_if_changed
+    data, orjson_ok = parse_json(path.read_bytes())
+    write_if_changed(path, dumps_indented(data, use_orjson=orjson_ok))
+"""
+
+import json
+import os
+from pathlib import Path
+
+# Optional: orjson parses/serializes large journals much faster than stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def parse_json(raw):
+    """
+    Parse JSON bytes -> (data, orjson_ok), with orjson when available. orjson_ok is False
+    when the stdlib parser was needed (e.g. for NaN), and such data must be written back
+    with dumps_indented(..., use_orjson=False).
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(raw), True
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw), False
+
+def loads_json(raw):
+    """Parse JSON bytes (see parse_json)."""
+    return parse_json(raw)[0]
+
+def dumps_indented(obj, use_orjson=True):
+    """
+    Serialize obj with 2-space indentation, as UTF-8 bytes. orjson writes NaN/Infinity as
+    null, so pass use_orjson=False for data that parse_json needed stdlib json for.
+    """
+    if use_orjson and orjson is not None:
+        try:
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            data = None  # e.g. integers wider than 64 bits
+        # stdlib escapes non-ASCII; keep that layout so write_if_changed sees unchanged files as such
+        if data is not None and data.isascii():
+            return data
+    return json.dumps(obj, indent=2).encode()
+
+def write_if_changed(path, data):
+    """
+    Replace path's contents with the bytes `data` unless they are already identical.
+    The new contents go to a temp file renamed over path, so a crash never leaves a
+    half-written journal. Returns True if the file was rewritten.
+    """
+    try:
+        if os.path.getsize(path) == len(data) and Path(path).read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
@@ -1,13 +1,43 @@
+import asyncio
+import atexit
 import os
 import json
 import difflib
+import hashlib
+import random
+import re
+import threading
 import time
 import sys
 from collections import defaultdict
+from email.utils import parsedate_to_datetime
+
+from json_io import dumps_indented, parse_json
+
+# Optional: stream large journals node by node instead of loading them whole
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: diff-match-patch's Myers diff is much faster than difflib on large code dumps
+try:
+    from diff_match_patch import diff_match_patch
+    _dmp = diff_match_patch()
+except ImportError:
+    _dmp = None
+
+# Optional: on-disk judgment cache shared across runs (llm_cache.py next to this script)
+try:
+    from llm_cache import cache_key, get_cache
+except ImportError:
+    get_cache = None
 
 # --- CONFIGURATION ---
 INPUT_JSON = "journal.json"
 OUTPUT_DATA = "journal_with_judgements.json"
+# Judgments are appended here as they arrive so a crashed run can resume; removed once OUTPUT_DATA is written
+CHECKPOINT_JSONL = "journal_with_judgements.jsonl"
 
 # API Setup (Gemini or OpenAI)
 LLM_PROVIDER = "gemini" 
@@ -17,91 +47,656 @@ OPENAI_MODEL = "gpt-4o"
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or "YOUR_GOOGLE_KEY_HERE"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or "YOUR_OPENAI_KEY_HERE"
 
-def get_llm_response(sys_prompt, usr_prompt, max_retries=3):
+# Reuse judgments for identical prompts across runs (disable with --no-cache)
+USE_LLM_CACHE = get_cache is not None
+
+# Bounds on a single request so one stuck or rambling call cannot stall the run
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", 512))
+# Outer guard for async calls, in case the SDK's own timeout does not fire
+LLM_CALL_DEADLINE = float(os.getenv("LLM_CALL_DEADLINE", 45))
+
+# Maximum number of judge requests in flight at once
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+
+def get_retry_after(error):
+    """
+    Return the provider's Retry-After hint (in seconds) attached to an API error, or None.
+    Both the Gemini and OpenAI SDKs expose the HTTP response on their exceptions.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # Retry-After may also be an HTTP date
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# Proactive client-side rate limits, sized a little under the provider quotas
+RATE_LIMITS = {
+    "gemini": (int(os.getenv("GEMINI_RPM", 14)), int(os.getenv("GEMINI_TPM", 1_000_000))),
+    "openai": (int(os.getenv("OPENAI_RPM", 500)), int(os.getenv("OPENAI_TPM", 30_000))),
+}
+
+class TokenBucket:
+    """
+    Requests-per-minute and tokens-per-minute limiter.
+
+    Callers reserve capacity up front (the balance may go negative) and then sleep
+    until it has refilled, so concurrent callers queue up fairly without holding a
+    lock while they wait. penalize() pauses everyone after a 429.
+    """
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests_available = float(rpm)
+        self.tokens_available = float(tpm)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, requests, tokens):
+        """Take capacity now and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last
+            self._last = now
+            self.requests_available = min(self.rpm, self.requests_available + elapsed * self.rpm / 60)
+            self.tokens_available = min(self.tpm, self.tokens_available + elapsed * self.tpm / 60)
+            self.requests_available -= requests
+            self.tokens_available -= tokens
+            wait = max(
+                0.0,
+                -self.requests_available * 60 / self.rpm,
+                -self.tokens_available * 60 / self.tpm,
+                self._blocked_until - now,
+            )
+            return wait
+
+    def acquire(self, requests=1, tokens=0):
+        wait = self._reserve(requests, tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, requests=1, tokens=0):
+        wait = self._reserve(requests, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, wait):
+        """Hold back all callers for `wait` seconds (e.g. a 429's Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + wait)
+
+_buckets = {}
+
+def get_rate_limiter():
+    """Shared TokenBucket for LLM_PROVIDER."""
+    if LLM_PROVIDER not in _buckets:
+        rpm, tpm = RATE_LIMITS.get(LLM_PROVIDER, (60, 1_000_000))
+        _buckets[LLM_PROVIDER] = TokenBucket(rpm, tpm)
+    return _buckets[LLM_PROVIDER]
+
+def estimate_tokens(sys_prompt, usr_prompt, max_output_tokens=LLM_MAX_OUTPUT_TOKENS):
+    """Rough token cost of a call: ~4 characters per token plus the output budget."""
+    return (len(sys_prompt) + len(usr_prompt)) // 4 + max_output_tokens
+
+# Clients are created once and reused so their HTTP connection pools are shared
+_clients = {}
+
+# Optional: with the h2 package installed, concurrent requests share one HTTP/2 connection
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+def _gemini_http_options():
+    from google.genai import types
+    # HttpOptions.timeout is in milliseconds
+    options = {"timeout": int(LLM_TIMEOUT * 1000)}
+    if HTTP2:
+        try:
+            return types.HttpOptions(**options, client_args={"http2": True}, async_client_args={"http2": True})
+        except (TypeError, ValueError):
+            # google-genai releases before client_args existed
+            pass
+    return types.HttpOptions(**options)
+
+def get_client(asynchronous=False):
+    """Lazily create (and cache) the SDK client for LLM_PROVIDER."""
+    key = (LLM_PROVIDER, asynchronous)
+    if key not in _clients:
+        if LLM_PROVIDER == "gemini":
+            from google import genai
+            client = genai.Client(api_key=GOOGLE_API_KEY, http_options=_gemini_http_options())
+            # The Gemini client exposes its async API as client.aio
+            _clients[key] = client.aio if asynchronous else client
+        elif LLM_PROVIDER == "openai":
+            import openai
+            if asynchronous:
+                cls, http_client = openai.AsyncOpenAI, (openai.DefaultAsyncHttpxClient(http2=True) if HTTP2 else None)
+            else:
+                cls, http_client = openai.OpenAI, (openai.DefaultHttpxClient(http2=True) if HTTP2 else None)
+            # Retries are handled by our own backoff loop
+            _clients[key] = cls(
+                api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT, max_retries=0, http_client=http_client
+            )
+        else:
+            return None
+    return _clients[key]
+
+async def close_async_clients():
+    """
+    Close the async clients; they are bound to the event loop that created them,
+    so each asyncio.run() gets fresh ones.
+    """
+    for key in [k for k in _clients if k[1]]:
+        client = _clients.pop(key)
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+@atexit.register
+def close_clients():
+    for key in [k for k in _clients if not k[1]]:
+        close = getattr(_clients.pop(key), "close", None)
+        if close is not None:
+            close()
+
+def _gemini_config(sys_prompt, max_output_tokens):
+    from google.genai import types
+    return types.GenerateContentConfig(
+        system_instruction=sys_prompt,
+        response_mime_type="application/json",
+        temperature=0.1,
+        max_output_tokens=max_output_tokens
+    )
+
+def _openai_messages(sys_prompt, usr_prompt):
+    return [{"role":"system","content":sys_prompt},{"role":"user","content":usr_prompt}]
+
+def _rate_limit_wait(error, attempt, max_retries):
+    """Seconds to wait before retrying a 429, or None if the error should be returned."""
+    if "429" in str(error) and attempt < max_retries - 1:
+        # Honor the provider's hint, otherwise back off exponentially with jitter
+        return min(get_retry_after(error) or (2 ** attempt + random.uniform(0, 1)), 60)
+    return None
+
+def _model_name():
+    return GEMINI_MODEL if LLM_PROVIDER == "gemini" else OPENAI_MODEL
+
+def _cache_lookup(sys_prompt, usr_prompt):
+    """(key, cached judgment or None); key is None when caching is disabled."""
+    if not USE_LLM_CACHE:
+        return None, None
+    key = cache_key(LLM_PROVIDER, _model_name(), sys_prompt, usr_prompt)
+    return key, get_cache().get(key)
+
+def _cache_store(key, result):
+    # Errors are never cached so they get retried on the next run
+    if key is not None and not (isinstance(result, dict) and result.get("status") == "error"):
+        get_cache().put(key, result)
+    return result
+
+def _is_timeout(error):
+    # asyncio.TimeoutError is TimeoutError; the SDKs raise their own *Timeout* types
+    return isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower()
+
+def _timeout_wait(error, attempt, max_retries):
+    """Seconds to wait before retrying a timed-out call, or None if out of attempts."""
+    if _is_timeout(error) and attempt < max_retries - 1:
+        return min(2 ** attempt + random.uniform(0, 1), 60)
+    return None
+
+def _error_result(error):
+    result = {"status": "error", "reason": str(error) or type(error).__name__}
+    retry_after = get_retry_after(error)
+    if retry_after is not None:
+        result["retry_after"] = retry_after
+    return result
+
+def get_llm_response(sys_prompt, usr_prompt, max_retries=3, max_output_tokens=LLM_MAX_OUTPUT_TOKENS):
     """Handles API calls to the selected provider with exponential backoff retry logic."""
+    key, cached = _cache_lookup(sys_prompt, usr_prompt)
+    if cached is not None:
+        return cached
+    return _cache_store(key, _call_llm(sys_prompt, usr_prompt, max_retries, max_output_tokens))
+
+def _call_llm(sys_prompt, usr_prompt, max_retries, max_output_tokens):
+    limiter = get_rate_limiter()
+    est_tokens = estimate_tokens(sys_prompt, usr_prompt, max_output_tokens)
     for attempt in range(max_retries):
+        limiter.acquire(tokens=est_tokens)
         try:
+            client = get_client()
             if LLM_PROVIDER == "gemini":
-                from google import genai
-                from google.genai import types
-                client = genai.Client(api_key=GOOGLE_API_KEY)
                 resp = client.models.generate_content(
                     model=GEMINI_MODEL,
                     contents=usr_prompt,
-                    config=types.GenerateContentConfig(
-                        system_instruction=sys_prompt,
-                        response_mime_type="application/json",
-                        temperature=0.1
-                    )
+                    config=_gemini_config(sys_prompt, max_output_tokens)
                 )
                 return json.loads(resp.text)
             elif LLM_PROVIDER == "openai":
-                from openai import OpenAI
-                client = OpenAI(api_key=OPENAI_API_KEY)
                 resp = client.chat.completions.create(
                     model=OPENAI_MODEL,
-                    messages=[{"role":"system","content":sys_prompt},{"role":"user","content":usr_prompt}],
-                    response_format={"type":"json_object"}, temperature=0.1
+                    messages=_openai_messages(sys_prompt, usr_prompt),
+                    response_format={"type":"json_object"}, temperature=0.1,
+                    max_tokens=max_output_tokens
                 )
                 return json.loads(resp.choices[0].message.content)
         except Exception as e:
-            # Check if it's a rate limit error
-            if "429" in str(e) and attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # 1s, 2s, 4s
-                print(f"\n  ⚠ Rate limit (429), waiting {wait_time}s before retry...", flush=True)
+            wait_time = _rate_limit_wait(e, attempt, max_retries)
+            if wait_time is not None:
+                # The bucket absorbs the backoff, so concurrent callers slow down too
+                print(f"\n  ⚠ Rate limit (429), waiting {wait_time:.1f}s before retry...", flush=True)
+                limiter.penalize(wait_time)
+                continue
+            wait_time = _timeout_wait(e, attempt, max_retries)
+            if wait_time is not None:
+                print(f"\n  ⚠ Request timed out, retrying in {wait_time:.1f}s...", flush=True)
                 time.sleep(wait_time)
                 continue
-            # Return error on final attempt or non-429 errors
-            return {"status": "error", "reason": str(e)}
+            # Return error on final attempt or non-retryable errors
+            return _error_result(e)
     
     return {"status": "error", "reason": "Unknown provider"}
 
-def build_tree_structure(steps, node2parent):
+async def get_llm_response_async(sys_prompt, usr_prompt, max_retries=3, max_output_tokens=LLM_MAX_OUTPUT_TOKENS):
+    """Async variant of get_llm_response using the providers' non-blocking clients."""
+    key, cached = _cache_lookup(sys_prompt, usr_prompt)
+    if cached is not None:
+        return cached
+    return _cache_store(key, await _call_llm_async(sys_prompt, usr_prompt, max_retries, max_output_tokens))
+
+async def _call_llm_async(sys_prompt, usr_prompt, max_retries, max_output_tokens):
+    limiter = get_rate_limiter()
+    est_tokens = estimate_tokens(sys_prompt, usr_prompt, max_output_tokens)
+    for attempt in range(max_retries):
+        await limiter.acquire_async(tokens=est_tokens)
+        try:
+            client = get_client(asynchronous=True)
+            if LLM_PROVIDER == "gemini":
+                resp = await asyncio.wait_for(client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=usr_prompt,
+                    config=_gemini_config(sys_prompt, max_output_tokens)
+                ), timeout=LLM_CALL_DEADLINE)
+                return json.loads(resp.text)
+            elif LLM_PROVIDER == "openai":
+                resp = await asyncio.wait_for(client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=_openai_messages(sys_prompt, usr_prompt),
+                    response_format={"type":"json_object"}, temperature=0.1,
+                    max_tokens=max_output_tokens
+                ), timeout=LLM_CALL_DEADLINE)
+                return json.loads(resp.choices[0].message.content)
+        except Exception as e:
+            wait_time = _rate_limit_wait(e, attempt, max_retries)
+            if wait_time is not None:
+                print(f"\n  ⚠ Rate limit (429), waiting {wait_time:.1f}s before retry...", flush=True)
+                limiter.penalize(wait_time)
+                continue
+            wait_time = _timeout_wait(e, attempt, max_retries)
+            if wait_time is not None:
+                print(f"\n  ⚠ Request timed out, retrying in {wait_time:.1f}s...", flush=True)
+                await asyncio.sleep(wait_time)
+                continue
+            return _error_result(e)
+    
+    return {"status": "error", "reason": "Unknown provider"}
+
+def _dmp_line_opcodes(a, b):
+    """difflib-style opcodes for line lists a and b, computed by diff-match-patch in line mode."""
+    # Encode each distinct line as one character so the character diff is a line diff
+    index = {}
+    enc_a = "".join(chr(index.setdefault(line, len(index))) for line in a)
+    enc_b = "".join(chr(index.setdefault(line, len(index))) for line in b)
+    
+    opcodes = []
+    i = j = 0
+    for op, text in _dmp.diff_main(enc_a, enc_b, False):
+        n = len(text)
+        if op == 0:
+            opcodes.append(("equal", i, i + n, j, j + n))
+            i += n
+            j += n
+        elif op < 0:
+            opcodes.append(("delete", i, i + n, j, j))
+            i += n
+        else:
+            opcodes.append(("insert", i, i, j, j + n))
+            j += n
+    return opcodes
+
+def _grouped_opcodes(codes, n=3):
+    """Same hunk grouping as difflib.SequenceMatcher.get_grouped_opcodes."""
+    codes = list(codes) or [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+    
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+def _unified_range(start, stop):
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+def compute_diff(a, b):
     """
-    Update parent and children relationships in steps based on node2parent mapping.
+    Unified diff (no line terminators, like difflib.unified_diff(..., lineterm=""))
+    between two lists of code lines, e.g. prev_code.splitlines() and curr_code.splitlines().
+    """
+    if _dmp is None:
+        return "\n".join(difflib.unified_diff(a, b, lineterm=""))
     
-    Args:
-        steps: List of node dictionaries with 'id' field
-        node2parent: Dict mapping child_node_id -> parent_node_id
+    out = []
+    for group in _grouped_opcodes(_dmp_line_opcodes(a, b)):
+        if not out:
+            out += ["--- ", "+++ "]
+        first, last = group[0], group[-1]
+        out.append(f"@@ -{_unified_range(first[1], last[2])} +{_unified_range(first[3], last[4])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                out.extend(" " + line for line in a[i1:i2])
+                continue
+            out.extend("-" + line for line in a[i1:i2])
+            out.extend("+" + line for line in b[j1:j2])
+    return "\n".join(out)
+
+# Character budget for a diff in a prompt; longer diffs keep only their leading whole hunks
+DIFF_CHAR_BUDGET = int(os.getenv("DIFF_CHAR_BUDGET", 8000))
+
+_HUNK_START = re.compile(r"(?m)^(?=@@ )")
+
+def truncate_diff(diff, budget=DIFF_CHAR_BUDGET):
     """
-    # Build parent and children mappings from node2parent
+    Shorten a unified diff to about budget characters by dropping trailing hunks, so the
+    model never sees a hunk cut in half. If not even the first hunk fits, it is cut at
+    a line boundary instead.
+    """
+    if len(diff) <= budget:
+        return diff
+    
+    # hunks[0] is the ---/+++ header
+    hunks = _HUNK_START.split(diff)
+    kept = []
+    used = 0
+    for hunk in hunks:
+        if used + len(hunk) > budget:
+            break
+        kept.append(hunk)
+        used += len(hunk)
+    
+    if len(kept) > 1:
+        text = "".join(kept).rstrip("\n")
+    else:
+        cut = diff.rfind("\n", 0, budget)
+        text = diff[:cut if cut > 0 else budget]
+    print(f"  ⚠ Diff over {budget} chars: dropped {len(hunks) - max(len(kept), 1)} of {len(hunks) - 1} hunks", flush=True)
+    return text + "\n...[Diff Truncated]"
+
+def tree_maps(node2parent):
+    """(parent_map, children_map) built from a node2parent mapping; children lists come sorted."""
     children_map = defaultdict(list)
     parent_map = {}
     
     for child_id, parent_id in node2parent.items():
         parent_map[child_id] = parent_id
         children_map[parent_id].append(child_id)
+    # Sort each list once here rather than once per node
+    for children in children_map.values():
+        children.sort()
+    return parent_map, children_map
+
+def build_tree_structure(steps, node2parent, maps=None):
+    """
+    Update parent and children relationships in steps based on node2parent mapping.
     
-    # Update nodes with correct parent and children relationships
-    for node in steps:
-        if not isinstance(node, dict) or "id" not in node:
-            continue
-        
+    Args:
+        steps: List of node dictionaries with 'id' field
+        node2parent: Dict mapping child_node_id -> parent_node_id
+        maps: Optional precomputed tree_maps(node2parent)
+    """
+    # Build parent and children mappings from node2parent
+    parent_map, children_map = maps or tree_maps(node2parent)
+    
+    # Root or unmapped nodes get no parent; leaves get no children
+    for node in [n for n in steps if isinstance(n, dict) and "id" in n]:
         node_id = node["id"]
+        node["parent"] = parent_map.get(node_id)
+        node["children"] = children_map.get(node_id, [])
+
+
+JUDGE_SYS_PROMPT = "You are a senior code reviewer. Verify if the code changes strictly implement the user's plan."
+
+async def judge_group(sem, items, checkpoint=None):
+    """Judge one (plan, diff) pair once and give the verdict to every step in items that shares it."""
+    _, _, _, plan, diff = items[0]
+    usr_p = f"PLAN:\n{plan}\n\nCODE DIFF:\n{diff}\n\nRespond with JSON: {{ 'status': 'aligned'|'partial'|'deviated', 'reason': 'concise explanation' }}"
+    async with sem:
+        judgment = await get_llm_response_async(JUDGE_SYS_PROMPT, usr_p)
+    for pos, step_num, step_id, _, _ in items:
+        if checkpoint is not None and step_id is not None:
+            checkpoint.write(json.dumps({"id": step_id, "llm_judgment": judgment}) + "\n")
+            checkpoint.flush()
+        print(f"Judged Step {step_num}: [{judgment.get('status', 'ERR').upper()}]", flush=True)
+    return [(item[0], judgment) for item in items]
+
+async def judge_steps(to_judge, checkpoint=None):
+    """
+    Judge all (position, step number, step id, plan, diff) items concurrently, at most
+    LLM_CONCURRENCY in flight, appending each verdict to the checkpoint file.
+    Steps with byte-identical (plan, diff) pairs share a single request.
+    Returns {position: judgment}.
+    """
+    groups = defaultdict(list)
+    for item in to_judge:
+        _, _, _, plan, diff = item
+        groups[hashlib.sha256(f"{plan}\x00{diff}".encode()).digest()].append(item)
+    if len(groups) < len(to_judge):
+        print(f"{len(to_judge) - len(groups)} steps repeat an earlier (plan, diff) pair and reuse its verdict")
+    
+    sem = asyncio.Semaphore(LLM_CONCURRENCY)
+    try:
+        results = await asyncio.gather(*(judge_group(sem, items, checkpoint) for items in groups.values()))
+    finally:
+        await close_async_clients()
+    return {pos: judgment for group in results for pos, judgment in group}
+
+def load_checkpoint(path=CHECKPOINT_JSONL):
+    """{step id: judgment} recorded by an earlier, interrupted run (errors excluded so they are retried)."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by the crash
+                continue
+            if record.get("llm_judgment", {}).get("status") != "error":
+                done[record["id"]] = record["llm_judgment"]
+    return done
+
+class UnsortedJournal(Exception):
+    """Raised while streaming when steps are not stored in step order."""
+
+def collect_work(steps, require_sorted=False, done=None):
+    """
+    Walk steps in step order and work out what each one needs.
+    Returns (judgments, to_judge): verdicts decided without the LLM keyed by position,
+    and the (position, step number, step id, plan, diff) items to send to it. Each diff
+    only depends on the previous step's code, so the LLM calls can then run concurrently.
+    done maps step ids to verdicts recovered from a checkpoint.
+    """
+    done = done or {}
+    judgments = {}
+    to_judge = []
+    skipped = {"status": "skipped", "reason": "No meaningful code changes or plan."}
+    # Each step's lines are split once and reused as the next step's previous lines;
+    # None means prev_code has not been split yet
+    prev_code = ""
+    prev_lines = []
+    last_step = None
+    for pos, step in enumerate(steps):
+        step_num = step.get('step', 0)
+        if require_sorted and last_step is not None and step_num < last_step:
+            raise UnsortedJournal(step_num)
+        last_step = step_num
+        curr_code = step.get('code', '')
+
+        if step.get('id') in done:
+            judgments[pos] = done[step['id']]
+            prev_code, prev_lines = curr_code, None
+            continue
+
+        # Skip if already judged (optional, remove check to force re-run)
+        if 'llm_judgment' in step and step['llm_judgment'].get('status') != 'error':
+            prev_code, prev_lines = curr_code, None
+            continue
+
+        # Without a plan or a code change there is nothing to judge, so skip before diffing
+        plan = step.get('plan', '')
+        if not plan.strip() or curr_code == prev_code:
+            judgments[pos] = dict(skipped)
+            prev_code, prev_lines = curr_code, (prev_lines if curr_code == prev_code else None)
+            continue
+
+        if prev_lines is None:
+            prev_lines = prev_code.splitlines()
+        curr_lines = curr_code.splitlines()
         
-        # Update parent field based on node2parent mapping
-        if node_id in parent_map:
-            node["parent"] = parent_map[node_id]
-        else:
-            # Root node or unmapped node - should have no parent
-            node["parent"] = None
-        
-        # Update children list based on children_map
-        if node_id in children_map:
-            node["children"] = sorted(children_map[node_id])
+        # Compute Diff
+        diff = compute_diff(prev_lines, curr_lines)
+
+        # Call API if there is a plan and code change
+        if not diff.strip():
+            judgments[pos] = dict(skipped)
         else:
-            # No children for this node
-            node["children"] = []
+            diff = truncate_diff(diff)
+            to_judge.append((pos, step.get('step'), step.get('id'), plan, diff))
+        prev_code, prev_lines = curr_code, curr_lines
+    return judgments, to_judge
+
+def run_judgments(judgments, to_judge):
+    if to_judge:
+        print(f"Judging {len(to_judge)} steps (concurrency {LLM_CONCURRENCY})...")
+        with open(CHECKPOINT_JSONL, 'a', encoding='utf-8') as checkpoint:
+            judgments.update(asyncio.run(judge_steps(to_judge, checkpoint)))
+    return judgments
+
+def finish_output(write):
+    """Write OUTPUT_DATA atomically via write(path), then drop the checkpoint it supersedes."""
+    tmp_path = OUTPUT_DATA + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, OUTPUT_DATA)
+    if os.path.exists(CHECKPOINT_JSONL):
+        os.remove(CHECKPOINT_JSONL)
+    print(f"\n✅ Judgments saved to: {OUTPUT_DATA}")
 
+def _journal_prefix(path):
+    """ijson prefix of the node list: 'item' for a plain list, 'nodes.item' for {"nodes": [...]}."""
+    with open(path, 'rb') as f:
+        head = f.read(1024).lstrip()
+    return 'item' if head.startswith(b'[') else 'nodes.item'
+
+def iter_steps(path):
+    """Stream the journal's nodes one at a time."""
+    with open(path, 'rb') as f:
+        yield from ijson.items(f, _journal_prefix(path), use_float=True)
+
+def read_node2parent(path):
+    if _journal_prefix(path) == 'item':
+        return {}
+    with open(path, 'rb') as f:
+        return dict(ijson.kvitems(f, 'node2parent'))
+
+def write_steps(path, steps):
+    """Write steps one at a time, in the same layout as dumps_indented(list(steps))."""
+    with open(path, 'wb') as f:
+        first = True
+        for step in steps:
+            f.write(b"[\n  " if first else b",\n  ")
+            # JSON strings never contain raw newlines, so re-indenting by line is safe
+            f.write(dumps_indented(step).replace(b"\n", b"\n  "))
+            first = False
+        f.write(b"[]" if first else b"\n]")
+
+def main_streaming(done):
+    """
+    Judge INPUT_JSON without holding every step's code in memory: one streaming pass
+    computes the diffs, a second re-streams the nodes and writes them with their
+    judgments. Requires the steps to be stored in step order (AIDE journals are);
+    raises UnsortedJournal otherwise.
+    """
+    print(f"Streaming {INPUT_JSON}...")
+    judgments, to_judge = collect_work(iter_steps(INPUT_JSON), require_sorted=True, done=done)
+    print("Scanned steps. Starting judgement...")
+    run_judgments(judgments, to_judge)
+
+    node2parent = read_node2parent(INPUT_JSON)
+    if node2parent:
+        print("Building tree structure from node2parent mapping...")
+        maps = tree_maps(node2parent)
+
+    def judged_steps():
+        for pos, step in enumerate(iter_steps(INPUT_JSON)):
+            if pos in judgments:
+                step['llm_judgment'] = judgments[pos]
+            if node2parent:
+                build_tree_structure([step], node2parent, maps)
+            yield step
+
+    finish_output(lambda path: write_steps(path, judged_steps()))
 
 def main():
     if not os.path.exists(INPUT_JSON):
         print(f"Error: {INPUT_JSON} not found.")
         sys.exit(1)
 
+    done = load_checkpoint()
+    if done:
+        print(f"Resuming: {len(done)} judgments recovered from {CHECKPOINT_JSONL}")
+
+    if ijson is not None:
+        try:
+            return main_streaming(done)
+        except UnsortedJournal:
+            print("Steps are not stored in order, loading the whole journal instead...")
+        except ijson.JSONError as e:
+            # e.g. NaN metrics, which only the stdlib parser accepts
+            print(f"Cannot stream {INPUT_JSON} ({e}), loading the whole journal instead...")
+
     print(f"Reading {INPUT_JSON}...")
-    with open(INPUT_JSON, 'r', encoding='utf-8') as f:
-        raw_data = json.load(f)
+    with open(INPUT_JSON, 'rb') as f:
+        raw_data, orjson_ok = parse_json(f.read())
     
     # Extract node2parent mapping if available
     node2parent = {}
@@ -122,50 +717,26 @@ def main():
     steps.sort(key=lambda x: x.get('step', 0))
     print(f"Loaded {len(steps)} steps. Starting judgement...")
 
-    prev_code = None
-    for i, step in enumerate(steps):
-        # Skip if already judged (optional, remove check to force re-run)
-        if 'llm_judgment' in step and step['llm_judgment'].get('status') != 'error':
-            prev_code = step.get('code', '')
-            continue
-
-        curr_code = step.get('code', '')
-        plan = step.get('plan', '')
-        
-        # Compute Diff
-        diff = "\n".join(difflib.unified_diff(
-            (prev_code or "").splitlines(), 
-            curr_code.splitlines(), 
-            lineterm=""
-        ))
-
-        # Call API if there is a plan and code change
-        if not diff.strip() or not plan.strip():
-            judgment = {"status": "skipped", "reason": "No meaningful code changes or plan."}
-        else:
-            print(f"Judging Step {step.get('step')}...", end=" ", flush=True)
-            if len(diff) > 15000: diff = diff[:15000] + "\n...[Diff Truncated]"
-            
-            sys_p = "You are a senior code reviewer. Verify if the code changes strictly implement the user's plan."
-            usr_p = f"PLAN:\n{plan}\n\nCODE DIFF:\n{diff}\n\nRespond with JSON: {{ 'status': 'aligned'|'partial'|'deviated', 'reason': 'concise explanation' }}"
-            
-            judgment = get_llm_response(sys_p, usr_p)
-            print(f"[{judgment.get('status', 'ERR').upper()}]")
-            time.sleep(2)  # Longer delay to avoid rate limits
-
-        step['llm_judgment'] = judgment
-        prev_code = curr_code
+    judgments, to_judge = collect_work(steps, done=done)
+    for pos, judgment in run_judgments(judgments, to_judge).items():
+        steps[pos]['llm_judgment'] = judgment
 
     # Build tree structure from node2parent mapping
     if node2parent:
         print("Building tree structure from node2parent mapping...")
         build_tree_structure(steps, node2parent)
 
-    # Save Results as a list
-    with open(OUTPUT_DATA, 'w', encoding='utf-8') as f:
-        json.dump(steps, f, indent=4)
-    
-    print(f"\n✅ Judgments saved to: {OUTPUT_DATA}")
+    # Save Results as a list (with stdlib json if that is what it took to read NaN metrics)
+    def write(path):
+        with open(path, 'wb') as f:
+            f.write(dumps_indented(steps, use_orjson=orjson_ok))
+    finish_output(write)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Judge each journal step's code diff against its plan")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM, ignoring the on-disk judgment cache")
+    args = parser.parse_args()
+    if args.no_cache:
+        USE_LLM_CACHE = False
     main()
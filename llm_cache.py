@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for LLM judgments.
+
+Entries are keyed by sha256(provider|model|system prompt|user prompt) and stored as
+zlib-compressed JSON in a single SQLite table, so identical (plan, diff) prompts are
+only paid for once across runs, crashes and sibling branches.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# Shared by every run; override with LLM_CACHE_PATH
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or str(Path(__file__).parent / ".llm_cache.db")
+
+def cache_key(*parts):
+    """sha256 hex digest of the parts joined with '|'."""
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+class LLMCache:
+    """SQLite-backed key -> JSON value store, safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created_at INTEGER)"
+        )
+
+    def get(self, key):
+        """Cached value for key, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value).encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, blob, int(time.time()))
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(path=DEFAULT_CACHE_PATH):
+    """Process-wide LLMCache for path, opened on first use."""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMCache(path)
+        return _caches[path]
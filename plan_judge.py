@@ -1,11 +1,33 @@
+import asyncio
 import json
+import logging
 from collections import defaultdict
+from pathlib import Path
 from google import genai
-from openai import OpenAI
+from openai import AsyncOpenAI
 import sys
 import os
 import argparse
-import time
+
+# Optional: share judge_journal's proactive rate limiter when it sits next to this script
+sys.path.insert(0, str(Path(__file__).parent))
+try:
+    from judge_journal import RATE_LIMITS, TokenBucket
+except ImportError:
+    TokenBucket = None
+from json_io import dumps_indented, loads_json
+
+# Optional: stream large journals node by node instead of loading them whole
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: local embeddings let clearly distinct sibling plans skip the LLM entirely
+try:
+    import embeddings
+except ImportError:
+    embeddings = None
 
 # --- CONFIGURATION ---
 DEFAULT_MODEL = "gemini"  # or "openai"
@@ -13,80 +35,162 @@ DEFAULT_MODEL = "gemini"  # or "openai"
 gemini_client = genai.Client(api_key="YOUR_GOOGLE_KEY_HERE")  # Replace with your actual key or set as env variable
 GEMINI_MODEL = "gemini-2.0-flash"
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
+openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 OPENAI_MODEL = "gpt-4-turbo"
 
-def judge_plans_with_gemini(plans_list, max_retries=3):
+# Prompts and raw responses are logged at DEBUG level (plan_judge.py --verbose shows them)
+log = logging.getLogger(__name__)
+
+# Maximum number of batched judge requests in flight at once
+PLAN_JUDGE_CONCURRENCY = int(os.getenv("PLAN_JUDGE_CONCURRENCY", 10))
+
+# Sibling groups whose most similar pair of plans scores below this cosine are never sent to the LLM
+SIMILARITY_THRESHOLD = float(os.getenv("PLAN_SIMILARITY_THRESHOLD", 0.55))
+
+# Estimated output tokens per request, for the rate limiter
+PLAN_OUTPUT_TOKENS = 512
+
+_limiters = {}
+
+def get_rate_limiter(llm_provider):
+    """Shared TokenBucket for llm_provider, or None without judge_journal."""
+    if TokenBucket is None:
+        return None
+    if llm_provider not in _limiters:
+        _limiters[llm_provider] = TokenBucket(*RATE_LIMITS.get(llm_provider, (60, 1_000_000)))
+    return _limiters[llm_provider]
+
+# Exit status when some batches still hit 429s after all retries (the report is written but incomplete).
+# EX_TEMPFAIL from sysexits.h: argparse already uses 2 for usage errors
+EXIT_RATE_LIMITED = 75
+
+class RateLimitExhausted(Exception):
+    """A request was still rate limited (HTTP 429) after every retry."""
+
+def is_rate_limit_error(e):
+    # google-genai errors carry .code, openai errors .status_code
+    return getattr(e, "code", None) == 429 or getattr(e, "status_code", None) == 429 or "429" in str(e)
+
+async def _wait_for_capacity(limiter, prompt):
+    if limiter is not None:
+        await limiter.acquire_async(tokens=len(prompt) // 4 + PLAN_OUTPUT_TOKENS)
+
+async def _backoff(limiter, wait_time):
+    """Wait out a 429, through the shared limiter when there is one so concurrent calls pause too."""
+    if limiter is not None:
+        limiter.penalize(wait_time)
+    else:
+        await asyncio.sleep(wait_time)
+
+# Sibling groups from up to PLAN_BATCH_SIZE parents share one request, capped at PLAN_BATCH_CHARS of plans
+PLAN_BATCH_SIZE = int(os.getenv("PLAN_BATCH_SIZE", 8))
+PLAN_BATCH_CHARS = 12000
+
+def build_batch_prompt(groups):
     """
-    Groups plans by semantic intent using Gemini.
-    Returns a list of lists containing indices.
+    Prompt asking for the duplicate plans within each of several sibling groups.
+    groups is a list of (parent_id, plans_list); the model sees short ids G0, G1, ...
     """
-    if not plans_list or len(plans_list) < 2:
-        return []
-
-    # The prompt explicitly tells Gemini to ignore wording and look for intent
-    prompt = f"""
-    You are an AI research auditor. Analyze the following list of research plans.
-    Identify which plans have the SAME technical intent or hypothesis, even if phrased differently.
+    blocks = []
+    for g, (_, plans_list) in enumerate(groups):
+        lines = chr(10).join([f"    {i}: {p}" for i, p in enumerate(plans_list)])
+        blocks.append(f"    GROUP G{g}:{chr(10)}{lines}")
+    
+    # The prompt explicitly tells the model to ignore wording and look for intent
+    return f"""
+    You are an AI research auditor. Below are several GROUPS of sibling research plans.
+    Within each group separately, identify which plans have the SAME technical intent or hypothesis, even if phrased differently.
+    Never compare plans from different groups.
     
-    Plans:
-    {chr(10).join([f"{i}: {p}" for i, p in enumerate(plans_list)])}
+{chr(10).join(blocks)}
     
-    Output ONLY a JSON list of lists, where each sub-list contains the indices of plans that are identical.
-    Example: [[0, 2], [1, 3, 4]]
-    If no plans are identical, return [].
+    Output ONLY a JSON object mapping every group id to a list of lists, where each sub-list contains the indices of plans in that group that are identical.
+    Example: {{"G0": [[0, 2], [1, 3, 4]], "G1": []}}
+    Use [] for a group with no identical plans.
     """
 
+def parse_llm_json(text):
+    """Parse a JSON reply, removing a surrounding markdown code fence if present."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return json.loads(text)
+
+def demux_batch_result(result, groups):
+    """Split a {group_id: [[idx, ...]]} reply back into {parent_id: [[idx, ...]]}."""
+    if isinstance(result, list) and len(groups) == 1:
+        # Single-group batches sometimes come back as the bare list of lists
+        result = {"G0": result}
+    if not isinstance(result, dict):
+        return {}
+    
+    per_parent = {}
+    for g, (pid, plans_list) in enumerate(groups):
+        valid = []
+        for group in result.get(f"G{g}") or []:
+            # Drop hallucinated indices instead of failing the whole batch
+            idxs = [i for i in group if isinstance(i, int) and 0 <= i < len(plans_list)] if isinstance(group, list) else []
+            if len(idxs) > 1:
+                valid.append(idxs)
+        per_parent[pid] = valid
+    return per_parent
+
+async def judge_plans_with_gemini_async(groups, max_retries=3):
+    """
+    Groups plans by semantic intent using Gemini, for several sibling groups at once.
+    groups is a list of (parent_id, plans_list).
+    Returns {parent_id: list of lists containing indices}; raises RateLimitExhausted
+    if the request is still rate limited after max_retries.
+    """
+    groups = [(pid, plans) for pid, plans in groups if plans and len(plans) >= 2]
+    if not groups:
+        return {}
+
+    prompt = build_batch_prompt(groups)
+    limiter = get_rate_limiter("gemini")
+
     for attempt in range(max_retries):
+        await _wait_for_capacity(limiter, prompt)
         try:
-            response = gemini_client.models.generate_content(
+            response = await gemini_client.aio.models.generate_content(
                 model=GEMINI_MODEL, 
                 contents=prompt
             )
-            print(prompt) # Debug: Show the prompt sent to Gemini
-            print(f"Gemini response: {response.text}") # Debug: Show raw response
-            # Clean potential markdown from the response
-            text = response.text.strip()
-            if text.startswith("```"):
-                text = text.split("```")[1]
-                if text.startswith("json"):
-                    text = text[4:]
-            
-            return json.loads(text)
+            log.debug("prompt=%s", prompt)
+            log.debug("Gemini response=%s", response.text)
+            return demux_batch_result(parse_llm_json(response.text), groups)
         except Exception as e:
             # Check if it's a rate limit error
-            if "429" in str(e) and attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # 1s, 2s, 4s
-                print(f"⚠ Rate limit (429), waiting {wait_time}s before retry...", flush=True)
-                time.sleep(wait_time)
-                continue
+            if is_rate_limit_error(e):
+                if attempt < max_retries - 1:
+                    wait_time = 2 ** attempt  # 1s, 2s, 4s
+                    print(f"⚠ Rate limit (429), waiting {wait_time}s before retry...", flush=True)
+                    await _backoff(limiter, wait_time)
+                    continue
+                raise RateLimitExhausted(str(e)) from e
             print(f"Error during Gemini inference: {e}")
-            return []
+            return {}
 
-def judge_plans_with_openai(plans_list, max_retries=3):
+async def judge_plans_with_openai_async(groups, max_retries=3):
     """
-    Groups plans by semantic intent using OpenAI.
-    Returns a list of lists containing indices.
+    Groups plans by semantic intent using OpenAI, for several sibling groups at once.
+    groups is a list of (parent_id, plans_list).
+    Returns {parent_id: list of lists containing indices}; raises RateLimitExhausted
+    if the request is still rate limited after max_retries.
     """
-    if not plans_list or len(plans_list) < 2:
-        return []
+    groups = [(pid, plans) for pid, plans in groups if plans and len(plans) >= 2]
+    if not groups:
+        return {}
 
-    # The prompt explicitly tells OpenAI to ignore wording and look for intent
-    prompt = f"""
-    You are an AI research auditor. Analyze the following list of research plans.
-    Identify which plans have the SAME technical intent or hypothesis, even if phrased differently.
-    
-    Plans:
-    {chr(10).join([f"{i}: {p}" for i, p in enumerate(plans_list)])}
-    
-    Output ONLY a JSON list of lists, where each sub-list contains the indices of plans that are identical.
-    Example: [[0, 2], [1, 3, 4]]
-    If no plans are identical, return [].
-    """
+    prompt = build_batch_prompt(groups)
+    limiter = get_rate_limiter("openai")
 
     for attempt in range(max_retries):
+        await _wait_for_capacity(limiter, prompt)
         try:
-            response = openai_client.chat.completions.create(
+            response = await openai_client.chat.completions.create(
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": "You are an AI research auditor that identifies duplicate research plans based on intent."},
@@ -94,75 +198,160 @@ def judge_plans_with_openai(plans_list, max_retries=3):
                 ],
                 temperature=0
             )
-            print(prompt) # Debug: Show the prompt sent to OpenAI
-            print(f"OpenAI response: {response.choices[0].message.content}") # Debug: Show raw response
-            # Clean potential markdown from the response
-            text = response.choices[0].message.content.strip()
-            if text.startswith("```"):
-                text = text.split("```")[1]
-                if text.startswith("json"):
-                    text = text[4:]
-            
-            return json.loads(text)
+            log.debug("prompt=%s", prompt)
+            log.debug("OpenAI response=%s", response.choices[0].message.content)
+            return demux_batch_result(parse_llm_json(response.choices[0].message.content), groups)
         except Exception as e:
             # Check if it's a rate limit error
-            if "429" in str(e) and attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # 1s, 2s, 4s
-                print(f"⚠ Rate limit (429), waiting {wait_time}s before retry...", flush=True)
-                time.sleep(wait_time)
-                continue
+            if is_rate_limit_error(e):
+                if attempt < max_retries - 1:
+                    wait_time = 2 ** attempt  # 1s, 2s, 4s
+                    print(f"⚠ Rate limit (429), waiting {wait_time}s before retry...", flush=True)
+                    await _backoff(limiter, wait_time)
+                    continue
+                raise RateLimitExhausted(str(e)) from e
             print(f"Error during OpenAI inference: {e}")
-            return []
+            return {}
+
+def prefilter_distinct(groups):
+    """
+    Drop (parent_id, plans_list) groups whose plans are all clearly different by
+    embedding similarity; they cannot contain duplicates, so no LLM call is needed.
+    Returns groups unchanged when embeddings are unavailable.
+    """
+    if embeddings is None or not embeddings.available():
+        return groups
+    
+    try:
+        kept = [(pid, plans) for pid, plans in groups
+                if embeddings.max_pairwise_similarity(plans) >= SIMILARITY_THRESHOLD]
+    except Exception as e:
+        # e.g. the model cannot be downloaded; judge everything as before
+        print(f"Embedding pre-filter unavailable ({e}), judging all sibling groups")
+        return groups
+    print(f"Embedding pre-filter: {len(groups) - len(kept)}/{len(groups)} sibling groups are clearly distinct, skipping them")
+    return kept
+
+def make_batches(groups, max_groups=PLAN_BATCH_SIZE, max_chars=PLAN_BATCH_CHARS):
+    """
+    Pack (parent_id, plans_list) groups into batches of at most max_groups groups and
+    about max_chars characters of plans; a group larger than max_chars gets its own batch.
+    """
+    batch, batch_chars = [], 0
+    for pid, plans in groups:
+        chars = sum(len(p) for p in plans)
+        if batch and (len(batch) >= max_groups or batch_chars + chars > max_chars):
+            yield batch
+            batch, batch_chars = [], 0
+        batch.append((pid, plans))
+        batch_chars += chars
+    if batch:
+        yield batch
+
+def iter_nodes(json_file, stream=True):
+    """Yield the nodes of a journal saved as a JSON list, streamed when ijson is available."""
+    if ijson is None or not stream:
+        with open(json_file, 'rb') as f:
+            yield from loads_json(f.read())
+        return
+    with open(json_file, 'rb') as f:
+        yield from ijson.items(f, 'item', use_float=True)
+
+def _group(nodes):
+    parent_map = defaultdict(list)
+    for node in nodes:
+        parent_map[node.get('parent')].append({'step': node.get('step'), 'plan': node.get('plan', 'No plan provided')})
+    return parent_map
 
-def analyze_all_plans(json_file, llm_provider=DEFAULT_MODEL):
+def group_by_parent(json_file):
+    """Group nodes by parent to compare siblings, keeping only the fields used here."""
+    try:
+        return _group(iter_nodes(json_file))
+    except Exception as e:
+        # ijson rejects NaN metrics, which the stdlib parser accepts
+        if ijson is not None and isinstance(e, ijson.JSONError):
+            return _group(iter_nodes(json_file, stream=False))
+        raise
+
+async def analyze_all_plans(json_file, llm_provider=DEFAULT_MODEL, nodes=None, judged=None):
     """
     Analyze all plans and identify redundancy.
     
     Args:
         json_file: Path to the journal JSON file
         llm_provider: "gemini" or "openai" (default: "gemini")
+        nodes: The journal's nodes if the caller already parsed json_file
+        judged: {parent_id: step groups} of sibling groups finished by an earlier call
+            that was rate limited; they are not judged again, and every group finished
+            now is added to it, so a retry only sends what is still missing
+    
+    Raises RateLimitExhausted after saving the report if any batch stayed rate limited.
     """
-    with open(json_file, 'r') as f:
-        data = json.load(f)
-
-    # Group nodes by parent to compare siblings
-    parent_map = defaultdict(list)
-    for node in data:
-        parent_map[node.get('parent')].append(node)
+    parent_map = _group(nodes) if nodes is not None else group_by_parent(json_file)
 
-    all_judgements = {}
+    if judged is None:
+        judged = {}
     
     # Choose the judgment function based on provider
-    judge_func = judge_plans_with_openai if llm_provider == "openai" else judge_plans_with_gemini
-
-    for pid, children in parent_map.items():
-        if not pid or len(children) < 2:
-            continue
-        
-        # Display short parent ID for tracking
-        display_id = pid[:8] if pid else "Root"
-        print(f"Judging {len(children)} sibling plans for Parent {display_id} using {llm_provider.upper()}...")
-        
-        plans = [c.get('plan', 'No plan provided') for c in children]
-        groups = judge_func(plans)
-        
-        # Map indices back to the actual Step numbers for clarity
-        step_groups = []
-        for group in groups:
-            step_group = [children[idx]['step'] for idx in group]
-            step_groups.append(sorted(step_group))
-        
-        if step_groups:
-            all_judgements[pid] = step_groups
+    judge_func = judge_plans_with_openai_async if llm_provider == "openai" else judge_plans_with_gemini_async
+
+    sibling_groups = [(pid, children) for pid, children in parent_map.items()
+                      if pid and len(children) >= 2 and pid not in judged]
+    # Embedding model load/encode is CPU-bound; keep it off the loop shared with other journals' batches
+    candidates = await asyncio.to_thread(
+        prefilter_distinct,
+        [(pid, [c.get('plan', 'No plan provided') for c in children]) for pid, children in sibling_groups]
+    )
+    for pid in {pid for pid, _ in sibling_groups} - {pid for pid, _ in candidates}:
+        judged[pid] = []
+    batches = list(make_batches(candidates))
+    print(f"Judging {len(sibling_groups)} sibling groups in {len(batches)} request(s) using {llm_provider.upper()}...")
+    
+    # Batches are independent, so run them concurrently
+    sem = asyncio.Semaphore(PLAN_JUDGE_CONCURRENCY)
+
+    rate_limited = []
+
+    async def judge_batch(batch):
+        async with sem:
+            # Display short parent IDs for tracking
+            print(f"  Batch of {len(batch)} parent(s): {', '.join(pid[:8] for pid, _ in batch)}")
+            try:
+                return await judge_func(batch)
+            except RateLimitExhausted as e:
+                # Keep the other batches' results; the caller decides whether to retry
+                print(f"Error during inference: rate limited after retries ({e})")
+                rate_limited.append(batch)
+                return None
+
+    results = await asyncio.gather(*(judge_batch(batch) for batch in batches))
+    
+    for batch, batch_groups in zip(batches, results):
+        if batch_groups is None:
+            continue  # rate limited; left for the caller's retry
+        for pid, plans in batch:
+            children = parent_map[pid]
+            # Map indices back to the actual Step numbers for clarity
+            step_groups = []
+            for group in batch_groups.get(pid, []):
+                step_group = [children[idx]['step'] for idx in group]
+                step_groups.append(sorted(step_group))
+            
+            judged[pid] = step_groups
+
+    all_judgements = {pid: step_groups for pid, step_groups in judged.items() if step_groups}
 
     # Save output to a separate file
     parent_dir = os.path.dirname(json_file)
     output_filename = os.path.join(parent_dir, 'plan_redundancy_report.json')
-    with open(output_filename, 'w') as f:
-        json.dump(all_judgements, f, indent=2)
+    with open(output_filename, 'wb') as f:
+        f.write(dumps_indented(all_judgements))
     
     print(f"\nAudit complete. Found redundancy in {len(all_judgements)} parent branches.")
     print(f"Results saved to {output_filename}")
+    
+    if rate_limited:
+        raise RateLimitExhausted(f"{len(rate_limited)} of {len(batches)} batches were still rate limited")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Judge and identify redundant research plans")
@@ -170,6 +359,17 @@ if __name__ == "__main__":
                         help="Path to the journal JSON file")
     parser.add_argument("--llm", choices=["gemini", "openai"], default=DEFAULT_MODEL,
                         help=f"LLM provider to use for plan judgment (default: {DEFAULT_MODEL})")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Log every prompt and raw LLM response")
     
     args = parser.parse_args()
-    analyze_all_plans(args.filepath, llm_provider=args.llm)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.verbose:
+        # Only this module's prompt/response logs, not the HTTP libraries' debug output
+        log.setLevel(logging.DEBUG)
+    try:
+        asyncio.run(analyze_all_plans(args.filepath, llm_provider=args.llm))
+    except RateLimitExhausted as e:
+        # Callers check the exit status instead of scanning output for "429"
+        print(f"⚠ {e}")
+        sys.exit(EXIT_RATE_LIMITED)
@@ -4,22 +4,23 @@ Run plan_judge.py on all journal_with_judgements.json files to analyze plan redu
 
 This script:
 1. Finds all journal_with_judgements.json files under runs/
-2. Runs plan_judge.py on each file to analyze plan redundancy
+2. Runs plan_judge's analysis on each file, in this process, several at a time
 3. Saves updated files with redundancy analysis
 
 Usage:
-    python run_plan_judge_all.py [--apply] [--limit N]
+    python run_plan_judge_all.py [--apply] [--limit N] [--workers N]
     
-    --apply    Actually run plan_judge (default is dry-run)
-    --limit N  Process only first N files
+    --apply      Actually run plan_judge (default is dry-run)
+    --limit N    Process only first N files
+    --workers N  Analyze up to N journals at once (default 4)
 """
 
-import json
+import asyncio
 import sys
-import subprocess
-import time
 from pathlib import Path
 
+from json_io import loads_json
+
 def get_analyzed_nodes(logs_dir):
     """
     Get the set of node IDs that have already been analyzed in plan_redundancy_report.json.
@@ -31,8 +32,8 @@ def get_analyzed_nodes(logs_dir):
         return set()
     
     try:
-        with open(report_path, 'r') as f:
-            report_data = json.load(f)
+        raw = report_path.read_bytes()
+        report_data = loads_json(raw)
         
         # Report structure is typically {node_id: analysis_result, ...}
         if isinstance(report_data, dict):
@@ -43,41 +44,50 @@ def get_analyzed_nodes(logs_dir):
         return set()
 
 
-def get_nodes_to_analyze(journal_path):
+def load_journal_nodes(journal_path):
     """
-    Get the set of node IDs from journal_with_judgements.json that have multiple children.
-    Returns a set of node IDs that need analysis.
+    Parse journal_with_judgements.json once (list or {"nodes": [...]} format).
+    Returns the node list, or None if the file cannot be read.
     """
     try:
-        with open(journal_path, 'r') as f:
-            data = json.load(f)
-        
-        # Handle both list and dict formats
-        if isinstance(data, list):
-            nodes = data
-        elif isinstance(data, dict) and "nodes" in data:
-            nodes = data["nodes"]
-        else:
-            return set()
-        
-        # Find nodes with multiple children
-        nodes_to_analyze = set()
-        for node in nodes:
-            if isinstance(node, dict) and "id" in node:
-                children = node.get("children", [])
-                if isinstance(children, list) and len(children) > 1:
-                    nodes_to_analyze.add(node["id"])
-        
-        return nodes_to_analyze
+        raw = journal_path.read_bytes()
+        data = loads_json(raw)
     except:
-        return set()
+        return None
+    
+    # Handle both list and dict formats
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and "nodes" in data:
+        return data["nodes"]
+    return None
 
 
-def run_plan_judge(journal_path, script_dir, apply=False, max_retries=3):
+def get_nodes_to_analyze(nodes):
     """
-    Run plan_judge.py on a single journal_with_judgements.json file.
+    Get the set of node IDs among already-parsed journal nodes that have multiple children.
+    Returns a set of node IDs that need analysis.
+    """
+    # Find nodes with multiple children
+    nodes_to_analyze = set()
+    for node in nodes or []:
+        if isinstance(node, dict) and "id" in node:
+            children = node.get("children", [])
+            if isinstance(children, list) and len(children) > 1:
+                nodes_to_analyze.add(node["id"])
+    
+    return nodes_to_analyze
+
+
+async def run_plan_judge(journal_path, apply=False, max_retries=3):
+    """
+    Run plan_judge's analysis on a single journal_with_judgements.json file.
     Skips if all nodes with multiple children already have analysis in plan_redundancy_report.json.
     Returns (success, message)
+    
+    There is no per-journal deadline: most of a journal's time can be spent waiting on
+    the provider rate limiter it shares with the other journals, which says nothing
+    about the journal itself. Each request is bounded by the SDK client's own timeout.
     """
     
     if not journal_path.exists():
@@ -85,11 +95,14 @@ def run_plan_judge(journal_path, script_dir, apply=False, max_retries=3):
     
     logs_dir = journal_path.parent
     
-    # Get nodes that already have analysis
-    analyzed_nodes = get_analyzed_nodes(logs_dir)
+    # Parse the journal once: it decides whether to run and is then handed to plan_judge.
+    # Plain file reads, kept off the event loop so other journals keep going.
+    analyzed_nodes, nodes = await asyncio.to_thread(
+        lambda: (get_analyzed_nodes(logs_dir), load_journal_nodes(journal_path))
+    )
     
     # Get nodes that need analysis
-    nodes_to_analyze = get_nodes_to_analyze(journal_path)
+    nodes_to_analyze = get_nodes_to_analyze(nodes)
     
     # Check if all nodes have already been analyzed
     if nodes_to_analyze and nodes_to_analyze.issubset(analyzed_nodes):
@@ -98,55 +111,50 @@ def run_plan_judge(journal_path, script_dir, apply=False, max_retries=3):
     if not nodes_to_analyze:
         return True, "No nodes with multiple children found (skipping)"
     
-    # Check if plan_judge.py exists
-    plan_judge_script = script_dir / "plan_judge.py"
-    if not plan_judge_script.exists():
-        return False, f"plan_judge.py not found at {plan_judge_script}"
-    
-    # Build command - plan_judge.py takes journal_with_judgements.json as first arg
-    cmd = ["python", str(plan_judge_script), str(journal_path)]
-    
     if not apply:
         unananalyzed = nodes_to_analyze - analyzed_nodes
         return True, f"Would run plan_judge ({len(unananalyzed)}/{len(nodes_to_analyze)} nodes need analysis)"
     
+    # Imported here so dry-runs work without the LLM SDKs installed
     try:
-        saw_429 = False
-        for attempt in range(1, max_retries + 1):
-            # Run plan_judge.py in the logs directory with the journal file
-            result = subprocess.run(
-                cmd,
-                cwd=str(logs_dir),
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-
-            stdout_text = result.stdout or ""
-            stderr_text = result.stderr or ""
-            combined = f"{stdout_text}\n{stderr_text}".lower()
-
-            if result.returncode == 0:
-                return True, "plan_judge succeeded"
-
+        import plan_judge
+    except ImportError as e:
+        return False, f"Cannot import plan_judge: {e}"
+    
+    saw_429 = False
+    # Sibling groups finished by earlier attempts; retries only send the rate-limited rest
+    judged = {}
+    for attempt in range(1, max_retries + 1):
+        try:
+            # Writes plan_redundancy_report.json next to the journal
+            await plan_judge.analyze_all_plans(str(journal_path), nodes=nodes, judged=judged)
+            return True, "plan_judge succeeded"
+        except plan_judge.RateLimitExhausted:
             # Retry on 429 RESOURCE_EXHAUSTED
-            if "429" in combined or "resource_exhausted" in combined:
-                saw_429 = True
-                if attempt < max_retries:
-                    time.sleep(2 ** attempt)
-                    continue
+            saw_429 = True
+            if attempt < max_retries:
+                await asyncio.sleep(2 ** attempt)
+                continue
+        except Exception as e:
+            return False, f"plan_judge failed: {str(e)[:500]}"
 
-            error_msg = (stderr_text or stdout_text)[:500]
-            return False, f"plan_judge failed: {error_msg}"
+    if saw_429:
+        return False, "plan_judge failed: 429 RESOURCE_EXHAUSTED"
+    return False, "plan_judge failed after retries"
 
-        if saw_429:
-            return False, "plan_judge failed: 429 RESOURCE_EXHAUSTED"
-        return False, "plan_judge failed after retries"
 
-    except subprocess.TimeoutExpired:
-        return False, "plan_judge timed out (>5 min)"
-    except Exception as e:
-        return False, f"Error running plan_judge: {str(e)[:200]}"
+async def run_all(journal_files, apply, workers):
+    """Yield (idx, journal_path, success, message) as journals finish, at most `workers` at once."""
+    sem = asyncio.Semaphore(max(1, workers))
+
+    async def run_one(idx, journal_path):
+        async with sem:
+            success, message = await run_plan_judge(journal_path, apply=apply)
+        return idx, journal_path, success, message
+
+    tasks = [run_one(idx, journal_path) for idx, journal_path in enumerate(journal_files, 1)]
+    for finished in asyncio.as_completed(tasks):
+        yield await finished
 
 
 def main():
@@ -166,6 +174,13 @@ def main():
         default=0,
         help="Limit processing to N files (0 = all)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of journals to analyze concurrently (default: 4). Requests from all "
+             "journals share one rate limiter per provider"
+    )
     
     args = parser.parse_args()
     
@@ -191,35 +206,39 @@ def main():
     errors = 0
     total_nodes_analyzed = 0
     
-    for idx, journal_path in enumerate(journal_files, 1):
-        if args.limit > 0 and idx > args.limit:
-            print(f"Stopping at limit of {args.limit}")
-            break
-        
-        rel_path = journal_path.relative_to(runs_dir)
-        
-        print(f"[{idx}/{len(journal_files)}] {rel_path}")
-        
-        success, message = run_plan_judge(journal_path, script_dir, apply=args.apply)
-        
-        if success:
-            print(f"  ✓ {message}")
-            files_processed += 1
-            if "skipping" in message.lower():
-                files_skipped += 1
+    if args.limit > 0 and len(journal_files) > args.limit:
+        print(f"Limiting to the first {args.limit} files\n")
+        journal_files = journal_files[:args.limit]
+    
+    async def report_all():
+        nonlocal files_processed, files_succeeded, files_skipped, errors, total_nodes_analyzed
+        async for idx, journal_path, success, message in run_all(journal_files, args.apply, args.workers):
+            rel_path = journal_path.relative_to(runs_dir)
+            
+            print(f"[{idx}/{len(journal_files)}] {rel_path}")
+            
+            if success:
+                print(f"  ✓ {message}")
+                files_processed += 1
+                if "skipping" in message.lower():
+                    files_skipped += 1
+                else:
+                    files_succeeded += 1
+                    # Extract number of nodes if mentioned
+                    if "/" in message:
+                        try:
+                            parts = message.split("/")
+                            total = int(parts[-1].split()[0])
+                            total_nodes_analyzed += total
+                        except:
+                            pass
             else:
-                files_succeeded += 1
-                # Extract number of nodes if mentioned
-                if "/" in message:
-                    try:
-                        parts = message.split("/")
-                        total = int(parts[-1].split()[0])
-                        total_nodes_analyzed += total
-                    except:
-                        pass
-        else:
-            print(f"  ✗ {message}")
-            errors += 1
+                print(f"  ✗ {message}")
+                errors += 1
+    
+    # Everything runs on one event loop, so SDK clients and connection pools are
+    # shared across journals instead of paying interpreter and SDK startup per file
+    asyncio.run(report_all())
     
     # Print summary
     print(f"\n{'='*60}")
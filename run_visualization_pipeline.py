@@ -32,9 +32,20 @@ import argparse
 import subprocess
 import time
 import csv
-import re
+import bisect
+import selectors
+import threading
+from functools import lru_cache
 from pathlib import Path
 import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_OUTPUT_FILE = "journal_viz_tree_dashboard.html"
+
+# Per-run settings for journal_viz_.py, written next to the journal. journal_viz_.py
+# reads it at startup (path passed in $VIZ_CONFIG) in place of its hard-coded defaults
+VIZ_CONFIG_FILE = "viz_config.json"
 
 # Color codes for terminal output
 class Colors:
@@ -47,20 +58,31 @@ class Colors:
     END = '\033[0m'
     BOLD = '\033[1m'
 
+if not sys.stdout.isatty():
+    # Redirected to a file or CI log: escape codes would only clutter it
+    for _name in ("HEADER", "BLUE", "CYAN", "GREEN", "YELLOW", "RED", "END", "BOLD"):
+        setattr(Colors, _name, "")
+
+# Colored prefix printed before the message for each log level
+_LEVELS = {
+    "INFO": f"{Colors.BLUE}[INFO]{Colors.END}",
+    "SUCCESS": f"{Colors.GREEN}[✓]{Colors.END}",
+    "WARNING": f"{Colors.YELLOW}[WARN]{Colors.END}",
+    "ERROR": f"{Colors.RED}[✗]{Colors.END}",
+}
+
+# log() is called from the background viz-config thread too; keep lines whole
+_log_lock = threading.Lock()
+
 def log(level, message):
     """Print colored log messages."""
-    if level == "INFO":
-        print(f"{Colors.BLUE}[INFO]{Colors.END} {message}")
-    elif level == "SUCCESS":
-        print(f"{Colors.GREEN}[✓]{Colors.END} {message}")
-    elif level == "WARNING":
-        print(f"{Colors.YELLOW}[WARN]{Colors.END} {message}")
-    elif level == "ERROR":
-        print(f"{Colors.RED}[✗]{Colors.END} {message}")
-    elif level == "STEP":
-        print(f"\n{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.END}")
-        print(f"{Colors.BOLD}{Colors.CYAN}{message}{Colors.END}")
-        print(f"{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.END}\n")
+    with _log_lock:
+        if level == "STEP":
+            print(f"\n{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.END}")
+            print(f"{Colors.BOLD}{Colors.CYAN}{message}{Colors.END}")
+            print(f"{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.END}\n")
+        elif level in _LEVELS:
+            print(f"{_LEVELS[level]} {message}")
 
 def parse_journal_path(journal_path):
     """
@@ -96,6 +118,26 @@ def parse_journal_path(journal_path):
     
     return competition_name, log_id, working_dir, journal_file
 
+# metrics.csv columns used by load_metrics_from_csv, in the order of each cached row tuple
+_METRICS_COLUMNS = ('competition_name', 'metric_name', 'metric_description', 'goal',
+                    'buggy_ignore', 'default_value_for_buggy')
+
+@lru_cache(maxsize=8)
+def _load_metrics_table(path, mtime_ns, size):
+    """
+    Parse metrics.csv once per (path, mtime, size).
+    Returns (sorted [(lowercase competition_name, row index)], rows), where each row is a
+    tuple of the _METRICS_COLUMNS values.
+    """
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        idx = [header.index(col) for col in _METRICS_COLUMNS]
+        # Short (malformed) rows get empty values instead of failing the whole table
+        rows = [tuple(row[i] if i < len(row) else '' for i in idx) for row in reader if row]
+    names = sorted((row[0].lower(), i) for i, row in enumerate(rows))
+    return names, rows
+
 def load_metrics_from_csv(competition_name, metrics_csv_path="metrics.csv"):
     """
     Load metric info from metrics.csv based on competition name.
@@ -114,356 +156,286 @@ def load_metrics_from_csv(competition_name, metrics_csv_path="metrics.csv"):
         return None
     
     try:
-        with open(metrics_csv_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Use startswith() to match competition name
-                if row['competition_name'].lower().startswith(competition_name.lower()):
-                    return {
-                        "metric_name": row['metric_name'].title(),
-                        "metric_description": row['metric_description'],
-                        "goal": row['goal'].lower(),
-                        "ignore_buggy_without_metric": row['buggy_ignore'].lower() == 'true',
-                        "default_buggy_metric": float(row['default_value_for_buggy'])
-                    }
+        st = os.stat(metrics_csv_path)
+        names, rows = _load_metrics_table(os.path.abspath(metrics_csv_path), st.st_mtime_ns, st.st_size)
+
+        # Names matching the prefix form a contiguous run in sorted order; among them,
+        # take the one listed first in the CSV, as a top-to-bottom scan would
+        key = competition_name.lower()
+        best = None
+        i = bisect.bisect_left(names, (key,))
+        while i < len(names) and names[i][0].startswith(key):
+            if best is None or names[i][1] < best:
+                best = names[i][1]
+            i += 1
+
+        if best is not None:
+            _, metric_name, metric_description, goal, buggy_ignore, default_value = rows[best]
+            return {
+                "metric_name": metric_name.title(),
+                "metric_description": metric_description,
+                "goal": goal.lower(),
+                "ignore_buggy_without_metric": buggy_ignore.lower() == 'true',
+                "default_buggy_metric": float(default_value)
+            }
         log("WARNING", f"Competition '{competition_name}' not found in metrics CSV")
         return None
     except Exception as e:
         log("ERROR", f"Failed to parse metrics CSV: {e}")
         return None
 
-def update_journal_viz_config(metrics_info, competition_name=None):
+def update_viz_config(working_dir, updates):
+    """Merge updates into working_dir/viz_config.json and return its path."""
+    path = working_dir / VIZ_CONFIG_FILE
+    config = {}
+    if path.exists():
+        try:
+            config = json.loads(path.read_text())
+        except ValueError:
+            log("WARNING", f"Ignoring unreadable {path.name}")
+    config.update(updates)
+    path.write_text(json.dumps(config, indent=2))
+    return path
+
+def configure_viz(metrics_info, working_dir, competition_name):
     """
-    Update METRIC_INFO, buggy handling configs, and competition name in journal_viz_.py
+    Record METRIC_INFO, buggy handling configs, and competition name for journal_viz_.py
+    in working_dir/viz_config.json
     """
     if not metrics_info:
-        return False
-    
-    try:
-        # Locate the original journal_viz_.py next to this script
-        script_dir = Path(__file__).resolve().parent
-        src_viz = script_dir / "journal_viz_.py"
-        if not src_viz.exists():
-            log("ERROR", f"Could not find journal_viz_.py in {script_dir}")
+        if not competition_name:
             return False
+        # Still record the competition name even if no metrics
+        metrics_info = {"metric_name": "Score", "metric_description": "Metric", "goal": "maximize", "ignore_buggy_without_metric": False, "default_buggy_metric": -0.1}
+
+    config = {
+        "METRIC_INFO": {
+            "NAME": metrics_info['metric_name'],
+            "DESCRIPTION": metrics_info['metric_description'],
+            "GOAL": metrics_info['goal'],
+        },
+        "IGNORE_BUGGY_WITHOUT_METRIC": metrics_info['ignore_buggy_without_metric'],
+        "DEFAULT_BUGGY_METRIC": metrics_info['default_buggy_metric'],
+    }
+    if competition_name:
+        config["COMPETITION_NAME"] = competition_name
 
-        with open(src_viz, "r") as f:
-            content = f.read()
-        
-        # Update METRIC_INFO dict - match multi-line format
-        old_metric_info = r'METRIC_INFO = \{\s*"NAME":[^}]*\}'
-        new_metric_info = f'''METRIC_INFO = {{
-    "NAME": "{metrics_info['metric_name']}",
-    "DESCRIPTION": "{metrics_info['metric_description']}",
-    "GOAL": "{metrics_info['goal']}" # Use "maximize" or "minimize"
-}}'''
-        content = re.sub(old_metric_info, new_metric_info, content, flags=re.DOTALL)
-        
-        # Update IGNORE_BUGGY_WITHOUT_METRIC
-        content = re.sub(
-            r'IGNORE_BUGGY_WITHOUT_METRIC = \w+',
-            f'IGNORE_BUGGY_WITHOUT_METRIC = {str(metrics_info["ignore_buggy_without_metric"])}',
-            content
-        )
-        
-        # Update DEFAULT_BUGGY_METRIC
-        content = re.sub(
-            r'DEFAULT_BUGGY_METRIC = [\d\-\.]+',
-            f'DEFAULT_BUGGY_METRIC = {metrics_info["default_buggy_metric"]}',
-            content
-        )
-        
-        # Update COMPETITION_NAME for description loading
-        if competition_name:
-            content = re.sub(
-                r'COMPETITION_NAME = "[^"]*"',
-                f'COMPETITION_NAME = "{competition_name}"',
-                content
-            )
-        
-        # Write the updated viz script into the current working directory
-        target_viz = Path.cwd() / "journal_viz_.py"
-        with open(target_viz, "w") as f:
-            f.write(content)
-
-        log("SUCCESS", f"Copied and updated journal_viz_.py to {target_viz} with metrics for {metrics_info['metric_name']}")
-        return True
+    try:
+        path = update_viz_config(working_dir, config)
     except Exception as e:
-        log("ERROR", f"Failed to update journal_viz_.py: {e}")
+        log("ERROR", f"Failed to write {VIZ_CONFIG_FILE}: {e}")
+        log("WARNING", "Proceeding with default configuration")
         return False
+    log("SUCCESS", f"Wrote {path} with metrics for {metrics_info['metric_name']}")
+    return True
 
-def check_file_exists(filepath, description):
-    """Check if a file exists and log status."""
-    p = Path(filepath)
-    if p.exists():
-        try:
-            size = p.stat().st_size
-        except Exception:
-            size = -1
-        log("SUCCESS", f"Found {description}: {p} ({size} bytes)")
+def _snapshot_dir(d):
+    """
+    {name: os.DirEntry} for directory d from a single scandir pass, or None if it can't be listed.
+    Existence checks become dict lookups; sizes are stat'ed (and cached on the entry) only when logged.
+    """
+    try:
+        with os.scandir(d) as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return None
+
+def _entry_size(entry):
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return -1
+
+def check_file_exists(working_dir, name, description, snap=None):
+    """Check if working_dir / name exists and log status. `snap` is a _snapshot_dir of working_dir."""
+    if snap is None:
+        snap = _snapshot_dir(working_dir) or {}
+    p = Path(working_dir) / name
+    entry = snap.get(name)
+    if entry is not None:
+        log("SUCCESS", f"Found {description}: {p} ({_entry_size(entry)} bytes)")
         return True
     else:
         log("ERROR", f"Missing {description}: {p}")
         return False
 
 
-def dump_directory_contents(d):
-    """Log the files in directory `d` to help debugging."""
+def dump_directory_contents(d, snap=None):
+    """Log the files in directory `d` to help debugging. `snap` is a _snapshot_dir of d."""
     try:
         p = Path(d)
-        if not p.exists() or not p.is_dir():
+        if snap is None:
+            snap = _snapshot_dir(p)
+        if snap is None:
             log("INFO", f"Working directory does not exist: {p}")
             return
         log("INFO", f"Contents of {p}:")
-        for child in sorted(p.iterdir()):
-            try:
-                sz = child.stat().st_size
-            except Exception:
-                sz = -1
-            log("INFO", f"  - {child.name} ({'dir' if child.is_dir() else 'file'}, {sz} bytes)")
+        line = "  - {} ({}, {} bytes)".format
+        for name in sorted(snap):
+            entry = snap[name]
+            log("INFO", line(name, 'dir' if entry.is_dir() else 'file', _entry_size(entry)))
     except Exception as e:
         log("WARNING", f"Could not list directory contents: {e}")
 
-def run_judge_journal(working_dir):
-    """Execute judge_journal.py with output files saved to working_dir"""
-    log("STEP", "STEP 1: Judging Journal Entries")
-    
-    # Check prerequisites
-    if not check_file_exists("journal.json", "Input journal"):
-        dump_directory_contents(working_dir)
-        return False
-    
-    # Check for API keys
-    has_gemini = os.getenv("GOOGLE_API_KEY")
-    has_openai = os.getenv("OPENAI_API_KEY")
-    
-    if not (has_gemini or has_openai):
+def _run_child(script_path, cwd, timeout, env=None):
+    """
+    Run a Python script, streaming its stdout to log INFO and its stderr to log ERROR
+    line by line as it runs. Kills the child and raises subprocess.TimeoutExpired
+    once `timeout` seconds have passed. `env` adds to this process's environment.
+    Returns the child's return code.
+    """
+    # Unbuffered so the child's progress shows up as it happens, not when it exits.
+    # A script copied into a run directory still imports the shared modules (json_io.py,
+    # llm_cache.py, ...) that sit next to this orchestrator.
+    pythonpath = os.pathsep.join(filter(None, (str(Path(__file__).resolve().parent), os.environ.get("PYTHONPATH"))))
+    env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONPATH=pythonpath, **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, str(script_path)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=str(cwd),
+        env=env
+    )
+    deadline = time.monotonic() + timeout
+    pending = {"INFO": b"", "ERROR": b""}
+
+    def emit(level, chunk):
+        for line in chunk.decode("utf-8", errors="replace").splitlines():
+            log(level, line)
+
+    with selectors.DefaultSelector() as sel:
+        sel.register(proc.stdout, selectors.EVENT_READ, "INFO")
+        sel.register(proc.stderr, selectors.EVENT_READ, "ERROR")
+        while sel.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                proc.kill()
+                proc.wait()
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            for key, _ in sel.select(timeout=remaining):
+                level = key.data
+                data = os.read(key.fd, 65536)
+                if not data:
+                    # EOF: flush a trailing line without a newline
+                    sel.unregister(key.fileobj)
+                    key.fileobj.close()
+                    if pending[level]:
+                        emit(level, pending[level])
+                    continue
+                # Only complete lines are logged; the tail waits for the next read
+                complete, _, pending[level] = (pending[level] + data).rpartition(b"\n")
+                if complete:
+                    emit(level, complete)
+
+    try:
+        return proc.wait(timeout=max(0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+
+def _warn_missing_api_keys(working_dir, output_file):
+    """judge step: the LLM calls need GOOGLE_API_KEY or OPENAI_API_KEY."""
+    if not (os.getenv("GOOGLE_API_KEY") or os.getenv("OPENAI_API_KEY")):
         log("WARNING", "No API keys found (GOOGLE_API_KEY or OPENAI_API_KEY)")
         log("WARNING", "Set environment variables or edit judge_journal.py with your keys")
-    
-    log("INFO", "Running judge_journal.py...")
-    try:
-        # Prefer a copy in working_dir, otherwise run the script next to this orchestrator
-        script_dir = Path(__file__).resolve().parent
-        script_path = working_dir / "judge_journal.py"
-        if not script_path.exists():
-            script_path = script_dir / "judge_journal.py"
-
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            timeout=3600,  # 1 hour timeout
-            cwd=str(working_dir)  # Run in working directory so outputs are written there
-        )
-        
-        if result.returncode != 0:
-            log("ERROR", f"judge_journal.py failed with return code {result.returncode}")
-            if result.stdout:
-                log("ERROR", f"stdout: {result.stdout}")
-            if result.stderr:
-                log("ERROR", f"stderr: {result.stderr}")
-            dump_directory_contents(working_dir)
-            return False
 
-        if result.stdout:
-            log("INFO", result.stdout)
-        
-        # Verify output in working directory
-        output_file = working_dir / "journal_with_judgements.json"
-        if output_file.exists():
-            log("SUCCESS", f"Output saved to {output_file.name}")
-            return True
-        else:
-            log("ERROR", "journal_with_judgements.json not created")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        log("ERROR", "judge_journal.py timed out after 1 hour")
-        dump_directory_contents(working_dir)
-        return False
-    except Exception as e:
-        log("ERROR", f"Exception running judge_journal.py: {e}")
-        log("ERROR", traceback.format_exc())
-        dump_directory_contents(working_dir)
-        return False
+def _prepare_viz(working_dir, output_file):
+    """viz step: record OUTPUT_FILE in viz_config.json and hand its path to journal_viz_.py."""
+    if output_file != DEFAULT_OUTPUT_FILE:
+        log("INFO", f"Using custom output file: {output_file}")
+    config_path = update_viz_config(working_dir, {"OUTPUT_FILE": output_file})
+    return {"VIZ_CONFIG": str(config_path)}
+
+# One pipeline step: `script` runs with cwd=working_dir, reads `inputs` (and, if present,
+# `optional_inputs`) there and must produce `output` (None = the --output file).
+# `prepare(working_dir, output_file)` runs first and may return extra child env vars;
+# `warn_codes` maps non-zero exit codes that still count as success to a warning.
+# Steps with `local_copy` prefer a copy of the script in working_dir.
+StepSpec = namedtuple(
+    "StepSpec",
+    "name title script inputs optional_inputs output timeout prepare warn_codes local_copy"
+)
+
+STEPS = [
+    StepSpec(
+        name="judge", title="STEP 1: Judging Journal Entries", script="judge_journal.py",
+        inputs=("journal.json",), optional_inputs=(), output="journal_with_judgements.json",
+        timeout=3600, prepare=_warn_missing_api_keys, warn_codes={}, local_copy=True
+    ),
+    StepSpec(
+        name="plan", title="STEP 2: Analyzing Plan Redundancy", script="plan_judge.py",
+        inputs=("journal_with_judgements.json",), optional_inputs=(), output="plan_redundancy_report.json",
+        timeout=1800, prepare=None, local_copy=True,
+        # plan_judge's EXIT_RATE_LIMITED: the report was saved, but some sibling groups are missing
+        warn_codes={75: "plan_judge.py hit API rate limits; plan_redundancy_report.json is incomplete"}
+    ),
+    StepSpec(
+        name="viz", title="STEP 3: Generating Visualization Dashboard", script="journal_viz_.py",
+        inputs=("journal_with_judgements.json",), optional_inputs=("plan_redundancy_report.json",), output=None,
+        # Always the script next to the orchestrator: per-run settings come from viz_config.json
+        timeout=600, prepare=_prepare_viz, warn_codes={}, local_copy=False
+    ),
+]
+
+def _format_duration(seconds):
+    if seconds % 3600 == 0:
+        hours = seconds // 3600
+        return f"{hours} hour{'s' if hours != 1 else ''}"
+    return f"{seconds // 60} minutes"
+
+def run_step(step, working_dir, output_file=DEFAULT_OUTPUT_FILE):
+    """Execute one StepSpec with its outputs saved to working_dir. Returns True on success."""
+    log("STEP", step.title)
+    output = step.output or output_file
 
-def run_plan_judge(working_dir):
-    """Execute plan_judge.py with output files saved to working_dir"""
-    log("STEP", "STEP 2: Analyzing Plan Redundancy")
-    
     # Check prerequisites
-    input_file = working_dir / "journal_with_judgements.json"
-    if not input_file.exists():
-        log("ERROR", f"Missing input: {input_file.name}")
-        dump_directory_contents(working_dir)
-        return False
-    
-    log("INFO", "Running plan_judge.py...")
-    try:
-        # Prefer a copy in working_dir, otherwise run the script next to this orchestrator
-        script_dir = Path(__file__).resolve().parent
-        script_path = working_dir / "plan_judge.py"
-        if not script_path.exists():
-            script_path = script_dir / "plan_judge.py"
-
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            timeout=1800,  # 30 minutes timeout
-            cwd=str(working_dir)  # Run in working directory so outputs are written there
-        )
-        
-        if result.returncode != 0:
-            log("ERROR", f"plan_judge.py failed with return code {result.returncode}")
-            if result.stdout:
-                log("ERROR", f"stdout: {result.stdout}")
-            if result.stderr:
-                log("ERROR", f"stderr: {result.stderr}")
-            dump_directory_contents(working_dir)
+    snap = _snapshot_dir(working_dir) or {}
+    for name in step.inputs:
+        if not check_file_exists(working_dir, name, "input", snap):
+            dump_directory_contents(working_dir, snap)
             return False
+    for name in step.optional_inputs:
+        if name not in snap:
+            log("WARNING", f"{name} not found. {step.script} output may be incomplete.")
 
-        if result.stdout:
-            log("INFO", result.stdout)
-        
-        # Verify output in working directory
-        output_file = working_dir / "plan_redundancy_report.json"
-        if output_file.exists():
-            log("SUCCESS", f"Output saved to {output_file.name}")
-            return True
-        else:
-            log("ERROR", "plan_redundancy_report.json not created")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        log("ERROR", "plan_judge.py timed out after 30 minutes")
-        dump_directory_contents(working_dir)
-        return False
-    except Exception as e:
-        log("ERROR", f"Exception running plan_judge.py: {e}")
-        log("ERROR", traceback.format_exc())
-        dump_directory_contents(working_dir)
-        return False
+    try:
+        env = step.prepare(working_dir, output) if step.prepare else None
 
-def run_visualization(output_file, working_dir):
-    """Execute journal_viz_.py with output files saved to working_dir"""
-    log("STEP", "STEP 3: Generating Visualization Dashboard")
-    
-    # Check prerequisites
-    input_file1 = working_dir / "journal_with_judgements.json"
-    if not input_file1.exists():
-        log("ERROR", f"Missing input: {input_file1.name}")
-        dump_directory_contents(working_dir)
-        return False
-    
-    input_file2 = working_dir / "plan_redundancy_report.json"
-    if not input_file2.exists():
-        log("WARNING", "Plan redundancy report not found. Visualization may be incomplete.")
-    
-    log("INFO", "Running journal_viz_.py...")
-    
-    # Temporarily update OUTPUT_FILE in journal_viz_.py if custom output specified
-    original_content = None
-    script_dir = Path(__file__).resolve().parent
-    # Determine source viz script (prefer working_dir copy, else script_dir)
-    src_viz = working_dir / "journal_viz_.py"
-    if not src_viz.exists():
-        src_viz = script_dir / "journal_viz_.py"
-
-    if output_file != "journal_viz_tree_dashboard.html":
-        log("INFO", f"Using custom output file: {output_file}")
+        log("INFO", f"Running {step.script}...")
+        # Prefer a copy in working_dir, otherwise run the script next to this orchestrator
+        script_path = Path(__file__).resolve().parent / step.script
+        if step.local_copy and step.script in snap:
+            script_path = working_dir / step.script
 
-        # Read the current journal_viz_.py (source)
-        try:
-            with open(src_viz, "r") as f:
-                viz_content = f.read()
-
-            # Replace OUTPUT_FILE
-            original_content = None
-            target_viz = working_dir / "journal_viz_.py"
-            if target_viz.exists():
-                try:
-                    with open(target_viz, "r") as f:
-                        original_content = f.read()
-                except Exception:
-                    original_content = None
-
-            viz_content = viz_content.replace(
-                'OUTPUT_FILE = "journal_viz_tree_dashboard.html"',
-                f'OUTPUT_FILE = "{output_file}"'
-            )
-
-            # Write temporary version into working_dir
-            with open(target_viz, "w") as f:
-                f.write(viz_content)
-        except Exception as e:
-            log("WARNING", f"Could not update OUTPUT_FILE: {e}")
-    
-    try:
-        # Prefer working_dir copy, otherwise run script next to orchestrator
-        script_path = working_dir / "journal_viz_.py"
-        if not script_path.exists():
-            script_path = script_dir / "journal_viz_.py"
-
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            timeout=600,  # 10 minutes timeout
-            cwd=str(working_dir)  # Run in working directory so outputs are written there
-        )
-
-        if result.returncode != 0:
-            log("ERROR", f"journal_viz_.py failed with return code {result.returncode}")
-            if result.stdout:
-                log("ERROR", f"stdout: {result.stdout}")
-            if result.stderr:
-                log("ERROR", f"stderr: {result.stderr}")
+        # Run in working directory so outputs are written there
+        returncode = _run_child(script_path, working_dir, timeout=step.timeout, env=env)
+
+        if returncode in step.warn_codes:
+            log("WARNING", step.warn_codes[returncode])
+        elif returncode != 0:
+            log("ERROR", f"{step.script} failed with return code {returncode}")
             dump_directory_contents(working_dir)
             return False
 
-        if result.stdout:
-            log("INFO", result.stdout)
-
         # Verify output in working directory
-        output_path = working_dir / output_file
-        if output_path.exists():
-            log("SUCCESS", f"Visualization generated: {output_file}")
+        if (working_dir / output).exists():
+            log("SUCCESS", f"Output saved to {output}")
             return True
         else:
-            log("ERROR", f"Output file not created: {output_file}")
+            log("ERROR", f"{output} not created")
             dump_directory_contents(working_dir)
             return False
 
     except subprocess.TimeoutExpired:
-        log("ERROR", "journal_viz_.py timed out after 10 minutes")
+        log("ERROR", f"{step.script} timed out after {_format_duration(step.timeout)}")
         dump_directory_contents(working_dir)
         return False
     except Exception as e:
-        log("ERROR", f"Exception running journal_viz_.py: {e}")
+        log("ERROR", f"Exception running {step.script}: {e}")
         log("ERROR", traceback.format_exc())
         dump_directory_contents(working_dir)
         return False
-    finally:
-        # Restore original journal_viz_.py if modified
-        if original_content:
-            try:
-                with open("journal_viz_.py", "w") as f:
-                    f.write(original_content)
-                log("INFO", "Restored original journal_viz_.py")
-            except Exception as e:
-                log("WARNING", f"Could not restore journal_viz_.py: {e}")
-
-def setup_working_directory(working_dir):
-    """Change to working directory and copy necessary files."""
-    try:
-        os.chdir(working_dir)
-        log("SUCCESS", f"Working directory: {working_dir}")
-        return True
-    except Exception as e:
-        log("ERROR", f"Failed to change to working directory: {e}")
-        return False
 
 def main():
     parser = argparse.ArgumentParser(
@@ -494,7 +466,7 @@ Examples:
     )
     parser.add_argument(
         "--output",
-        default="journal_viz_tree_dashboard.html",
+        default=DEFAULT_OUTPUT_FILE,
         help="Output HTML file (default: journal_viz_tree_dashboard.html)"
     )
     parser.add_argument(
@@ -540,63 +512,53 @@ Examples:
             log("WARNING", "Could not extract competition name; using defaults")
             metrics_info = None
         
-        # Change to working directory
-        if not setup_working_directory(working_dir):
-            return 1
-        
-        # Update journal_viz_.py if metrics were loaded
-        if metrics_info:
-            if not update_journal_viz_config(metrics_info, competition_name):
-                log("WARNING", "Proceeding with default configuration")
-        else:
-            # Still update with competition name even if no metrics
-            if competition_name:
-                update_journal_viz_config({"metric_name": "Score", "metric_description": "Metric", "goal": "maximize", "ignore_buggy_without_metric": False, "default_buggy_metric": -0.1}, competition_name)
+        # Every step addresses files as working_dir / name and runs children with cwd=working_dir,
+        # so the orchestrator itself never changes directory
+        log("SUCCESS", f"Working directory: {working_dir}")
     else:
         log("INFO", "No journal path provided; using current directory")
         working_dir = Path.cwd()
         metrics_info = None
     
+    # Writing viz_config.json doesn't depend on the journal, so it runs in the background
+    # while the judge and plan steps work
+    viz_pool = ThreadPoolExecutor(max_workers=1)
+    viz_future = None
+    if args.journal_path:
+        viz_future = viz_pool.submit(configure_viz, metrics_info, working_dir, competition_name)
+    
     # Track success
     steps_completed = []
     steps_failed = []
     
-    # Step 1: Judge Journal
-    if args.skip_judge:
-        log("INFO", "Skipping judgment step (--skip-judge)")
-        if check_file_exists(str(working_dir / "journal_with_judgements.json"), "journal_with_judgements.json"):
-            steps_completed.append("judge")
-        else:
-            log("ERROR", "Cannot skip judge step: journal_with_judgements.json not found")
-            steps_failed.append("judge")
-    else:
-        if run_judge_journal(working_dir):
-            steps_completed.append("judge")
-        else:
-            steps_failed.append("judge")
-    
-    # Step 2: Plan Redundancy Analysis
-    if steps_failed and "judge" in steps_failed:
-        log("ERROR", "Skipping plan analysis due to judge failure")
-        steps_failed.append("plan")
-    elif args.skip_plan:
-        log("INFO", "Skipping plan analysis (--skip-plan)")
-        steps_completed.append("plan")
-    else:
-        if run_plan_judge(working_dir):
-            steps_completed.append("plan")
-        else:
-            steps_failed.append("plan")
-    
-    # Step 3: Generate Visualization
-    if steps_failed and "judge" in steps_failed:
-        log("ERROR", "Skipping visualization due to judge failure")
-        steps_failed.append("viz")
-    else:
-        if run_visualization(args.output, working_dir):
-            steps_completed.append("viz")
+    for step in STEPS:
+        # Plan analysis and visualization both need the judgements
+        if "judge" in steps_failed:
+            log("ERROR", f"Skipping {step.name} step due to judge failure")
+            steps_failed.append(step.name)
+            continue
+        if step.name == "judge" and args.skip_judge:
+            log("INFO", "Skipping judgment step (--skip-judge)")
+            if check_file_exists(working_dir, step.output, step.output):
+                steps_completed.append(step.name)
+            else:
+                log("ERROR", f"Cannot skip judge step: {step.output} not found")
+                steps_failed.append(step.name)
+            continue
+        if step.name == "plan" and args.skip_plan:
+            log("INFO", "Skipping plan analysis (--skip-plan)")
+            steps_completed.append(step.name)
+            continue
+        if step.name == "viz":
+            # viz_config.json must be complete before journal_viz_.py reads it
+            if viz_future is not None:
+                viz_future.result()
+
+        if run_step(step, working_dir, args.output):
+            steps_completed.append(step.name)
         else:
-            steps_failed.append("viz")
+            steps_failed.append(step.name)
+    viz_pool.shutdown()
     
     # Print summary
     log("STEP", "PIPELINE SUMMARY")
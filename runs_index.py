@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Shared, incremental index of the runs/ tree.
+
+A scan records every directory under runs/ with its mtime, its subdirectories and which
+of the pipeline's files (TRACKED_FILES) it holds. The index is saved to runs/.index.json,
+so the next scan - by this process or by any other script - stats each directory and
+only lists again the ones whose mtime moved.
+
+    from runs_index import find_files
+    journals = find_files(runs_dir, "journal.json")
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+INDEX_FILENAME = ".index.json"
+INDEX_VERSION = 1
+
+# The files scripts look up through the index
+TRACKED_FILES = frozenset({
+    "journal.json",
+    "journal_with_judgements.json",
+    "journal_viz_tree_dashboard.html",
+})
+
+# Never hold run outputs; skipped (with dot-directories) while scanning runs/
+SKIP_DIRS = {'__pycache__', 'node_modules', 'venv'}
+
+# Directories modified this recently may change again within the same mtime tick;
+# they are listed afresh on every scan until they settle
+RACY_MTIME_NS = 1_000_000_000
+
+# Threads listing directories in parallel: on a cold cache or network filesystem each
+# readdir mostly waits on I/O, so overlapping them hides that latency
+SCAN_WORKERS = int(os.getenv("RUNS_SCAN_WORKERS", "16"))
+
+# Last index of each runs_dir in this process: {runs_dir: {rel dir: (mtime_ns, subdirs, files)}}.
+# mtime_ns is None for entries that must be listed again next time.
+_INDEXES = {}
+
+def _load_index(runs_dir):
+    """The index saved in runs_dir, or {} if there is none or it can't be used."""
+    try:
+        with open(os.path.join(runs_dir, INDEX_FILENAME), 'rb') as f:
+            saved = json.loads(f.read())
+        if saved.get("version") != INDEX_VERSION:
+            return {}
+        return {rel: tuple(entry) for rel, entry in saved["dirs"].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+def _save_index(runs_dir, index):
+    """Atomically replace runs_dir's saved index. Failing to save only costs a full rescan later."""
+    data = json.dumps({"version": INDEX_VERSION, "dirs": index}, separators=(',', ':')).encode()
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=INDEX_FILENAME, suffix=".tmp", dir=runs_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(runs_dir, INDEX_FILENAME))
+    except OSError:
+        pass
+
+def _scan_dir(runs_dir, rel, previous, current):
+    """
+    Index one directory (rel to runs_dir) into `current`, reusing its entry in `previous`
+    while its mtime is unchanged. Returns the rel paths of its subdirectories.
+    """
+    path = os.path.join(runs_dir, rel)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return []
+    cached = previous.get(rel)
+    # runs_dir itself is always listed: saving the index changes its mtime
+    if rel and cached is not None and cached[0] == mtime:
+        current[rel] = cached
+        return [os.path.join(rel, name) for name in cached[1]]
+
+    subdirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.name)
+                elif entry.name in TRACKED_FILES:
+                    files.append(entry.name)
+    except OSError:
+        # Unreadable directory; skipped like os.walk and glob do
+        return []
+    subdirs.sort()
+    files.sort()
+    if not rel or time.time_ns() - mtime <= RACY_MTIME_NS:
+        mtime = None
+    current[rel] = (mtime, subdirs, files)
+    return [os.path.join(rel, name) for name in subdirs]
+
+def refresh(runs_dir):
+    """
+    Bring runs_dir's index up to date and return it: {rel dir: (mtime_ns, subdirs, files)}.
+    The index is saved back to runs_dir when anything changed.
+    """
+    runs_dir = os.fspath(runs_dir)
+    previous = _INDEXES.get(runs_dir)
+    if previous is None:
+        previous = _load_index(runs_dir)
+    # Only directories reached this time are carried over, so deleted ones drop out
+    current = {}
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        pending = {pool.submit(_scan_dir, runs_dir, '', previous, current)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.update(pool.submit(_scan_dir, runs_dir, d, previous, current) for d in future.result())
+    _INDEXES[runs_dir] = current
+    if current != previous:
+        _save_index(runs_dir, current)
+    return current
+
+def find_files(runs_dir, name):
+    """Sorted paths of every file called `name` (one of TRACKED_FILES) under runs_dir."""
+    if name not in TRACKED_FILES:
+        raise ValueError(f"{name} is not tracked by the runs/ index")
+    runs_dir = os.fspath(runs_dir)
+    return sorted(
+        os.path.join(runs_dir, rel, name)
+        for rel, (_, _, files) in refresh(runs_dir).items()
+        if name in files
+    )
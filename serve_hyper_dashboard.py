@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Dynamic HTTP server for hyper_dashboard.html
-Generates the dashboard on-the-fly by scanning runs/ directory on each request.
+Generates the dashboard on-the-fly by scanning runs/ directory (re-scanned at most every few seconds).
 No need to re-run Python script - just refresh the browser!
 
 Usage:
@@ -11,46 +11,54 @@ Then open: http://localhost:8000/hyper_dashboard.html
 """
 
 import os
+import json
+import gzip
+import time
+import hashlib
 import http.server
-import socketserver
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from urllib.parse import urlparse
 
+import runs_index
+
 PORT = 8000
 
-class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
-    """HTTP handler that serves dynamic dashboard."""
-    
-    def do_GET(self):
-        """Handle GET requests."""
-        
-        # If requesting the dashboard, generate it dynamically
-        if self.path == '/hyper_dashboard.html' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.end_headers()
-            
-            # Get the runs directory (parent of parent of this script)
-            script_dir = Path(__file__).resolve().parent
-            runs_dir = script_dir.parent / "runs"
-            
-            # Generate dashboard HTML dynamically
-            html_content = self.generate_dashboard(runs_dir)
-            self.wfile.write(html_content.encode('utf-8'))
-            return
-        
-        # For all other requests, use default handler (serve files)
-        super().do_GET()
-    
-    def generate_dashboard(self, runs_dir):
-        """Generate dashboard HTML by scanning runs_dir."""
-        
-        # Find all visualization files
-        viz_files = self.find_visualization_files(runs_dir)
-        
-        html = f"""<!DOCTYPE html>
+# Rendered dashboard per runs_dir: {"mtime": runs_dir mtime, "time": monotonic time of render,
+# "etag": dashboard_etag() of its cards, "html": UTF-8 page, "gzip": the page gzip-compressed,
+# filled in on first gzip request}.
+# A new run date changes runs_dir's mtime; dashboards appearing deeper in the tree
+# don't, so cached pages are also re-rendered once they are DASHBOARD_CACHE_TTL old.
+_DASHBOARD_CACHE = {}
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "5"))
+
+VIZ_FILENAME = 'journal_viz_tree_dashboard.html'
+
+class ChunkedWriter:
+    """Write-only file object framing each write as an HTTP/1.1 chunk (Transfer-Encoding: chunked)."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        # An empty chunk would end the body
+        if data:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        """Write the terminating chunk; the connection stays open for the next request."""
+        self.wfile.write(b'0\r\n\r\n')
+
+# gzip level for the dashboard page: most of the size win at a fraction of level 9's CPU
+GZIP_LEVEL = 5
+
+# Dashboard page around the cards; the cards' JSON items are streamed between the two
+PROLOGUE_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -155,7 +163,24 @@ class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
             gap: 20px;
         }}
         
+        :root {{
+            /* Every card is the same height so the virtualized grid can compute row offsets */
+            --card-height: 260px;
+        }}
+        
+        #cardsContainer {{
+            position: relative;
+        }}
+        
+        #cardsWindow {{
+            position: absolute;
+            left: 0;
+            right: 0;
+        }}
+        
         .card {{
+            height: var(--card-height);
+            overflow: hidden;
             background: white;
             border-radius: 12px;
             padding: 24px;
@@ -183,6 +208,10 @@ class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
             color: #333;
             margin-bottom: 16px;
             word-break: break-word;
+            display: -webkit-box;
+            -webkit-line-clamp: 2;
+            -webkit-box-orient: vertical;
+            overflow: hidden;
         }}
         
         .card-link {{
@@ -207,6 +236,10 @@ class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
             padding-top: 16px;
             border-top: 1px solid #f0f0f0;
             word-break: break-all;
+            display: -webkit-box;
+            -webkit-line-clamp: 2;
+            -webkit-box-orient: vertical;
+            overflow: hidden;
         }}
         
         .empty-state {{
@@ -250,11 +283,11 @@ class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
             
             <div class="stats">
                 <div class="stat">
-                    <span class="stat-number">{len(viz_files)}</span>
+                    <span class="stat-number">{num_viz}</span>
                     <span class="stat-label">Visualizations</span>
                 </div>
                 <div class="stat">
-                    <span class="stat-number">{len(set(v['date_run'] for v in viz_files))}</span>
+                    <span class="stat-number">{num_dates}</span>
                     <span class="stat-label">Run Dates</span>
                 </div>
             </div>
@@ -264,15 +297,20 @@ class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
                     type="text" 
                     id="searchInput" 
                     placeholder="🔍 Search by competition name or date..."
-                    onkeyup="filterCards()"
+                    oninput="filterCards()"
                     autofocus
                 />
             </div>
         </header>
         
-        <div id="cardsContainer" class="grid">
-            {''.join(self.generate_card_html(v) for v in viz_files)}
+        <!-- Only the cards in and near the viewport are in the DOM; see the script below -->
+        <div id="cardsContainer">
+            <div id="cardsWindow" class="grid"></div>
         </div>
+        <script id="viz-data" type="application/json">[
+"""
+
+EPILOGUE_TEMPLATE = """]</script>
         
         <div id="emptyState" class="empty-state hidden">
             <h2>No visualizations found</h2>
@@ -281,85 +319,293 @@ class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
     </div>
     
     <footer>
-        Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} • MLE Bench Dynamic Dashboard Server
+        Generated on {generated_on} • MLE Bench Dynamic Dashboard Server
     </footer>
     
     <script>
+        // Card items from the server: {{html, search}}. Rendering all of them would make layout,
+        // paint and filtering O(cards), so only rows near the viewport are put in the DOM.
+        const items = JSON.parse(document.getElementById('viz-data').textContent);
+        const container = document.getElementById('cardsContainer');
+        const cardsWindow = document.getElementById('cardsWindow');
+        const CARD_MIN_WIDTH = 350;
+        const GAP = 20;
+        const OVERSCAN_ROWS = 3;
+        const CARD_HEIGHT = parseFloat(getComputedStyle(document.documentElement).getPropertyValue('--card-height'));
+        const ROW_HEIGHT = CARD_HEIGHT + GAP;
+        
+        let visible = items;
+        let cols = 1;
+        let rows = 0;
+        let shownFirst = -1;
+        let shownLast = -1;
+        let frameRequested = false;
+        
+        // Size the container for all visible cards, then render the rows in view
+        function layout() {{
+            cols = Math.max(1, Math.floor((container.clientWidth + GAP) / (CARD_MIN_WIDTH + GAP)));
+            rows = Math.ceil(visible.length / cols);
+            container.style.height = rows ? (rows * ROW_HEIGHT - GAP) + 'px' : '0';
+            cardsWindow.style.gridTemplateColumns = `repeat(${{cols}}, 1fr)`;
+            shownFirst = shownLast = -1;
+            render();
+        }}
+        
+        function render() {{
+            frameRequested = false;
+            const viewTop = Math.max(0, -container.getBoundingClientRect().top);
+            const first = Math.max(0, Math.floor(viewTop / ROW_HEIGHT) - OVERSCAN_ROWS);
+            const last = Math.min(rows, Math.ceil((viewTop + window.innerHeight) / ROW_HEIGHT) + OVERSCAN_ROWS);
+            if (first === shownFirst && last === shownLast) return;
+            shownFirst = first;
+            shownLast = last;
+            cardsWindow.style.top = (first * ROW_HEIGHT) + 'px';
+            cardsWindow.innerHTML = visible.slice(first * cols, last * cols).map(item => item.html).join('');
+        }}
+        
+        function scheduleRender() {{
+            if (!frameRequested) {{
+                frameRequested = true;
+                requestAnimationFrame(render);
+            }}
+        }}
+        
         function filterCards() {{
             const searchInput = document.getElementById('searchInput').value.toLowerCase();
-            const cards = document.querySelectorAll('.card');
-            let visibleCount = 0;
-            
-            cards.forEach(card => {{
-                const text = card.textContent.toLowerCase();
-                if (text.includes(searchInput)) {{
-                    card.classList.remove('hidden');
-                    visibleCount++;
-                }} else {{
-                    card.classList.add('hidden');
-                }}
-            }});
+            visible = searchInput ? items.filter(item => item.search.includes(searchInput)) : items;
             
             // Show empty state if no cards visible
-            const emptyState = document.getElementById('emptyState');
-            if (visibleCount === 0) {{
-                emptyState.classList.remove('hidden');
-            }} else {{
-                emptyState.classList.add('hidden');
-            }}
+            document.getElementById('emptyState').classList.toggle('hidden', visible.length > 0);
+            layout();
         }}
+        
+        window.addEventListener('scroll', scheduleRender, {{ passive: true }});
+        window.addEventListener('resize', layout);
+        filterCards();
     </script>
 </body>
 </html>
 """
+
+# The templates above split at their placeholders and encoded once; a render only
+# encodes the counts and the timestamp
+_PROLOGUE_PRE, _PROLOGUE_MID, _PROLOGUE_POST = (
+    part.encode('utf-8') for part in PROLOGUE_TEMPLATE.format(num_viz='\0', num_dates='\0').split('\0')
+)
+_EPILOGUE_PRE, _EPILOGUE_POST = (
+    part.encode('utf-8') for part in EPILOGUE_TEMPLATE.format(generated_on='\0').split('\0')
+)
+
+CARD_TEMPLATE = """        <div class="card">
+            <div class="card-date">{date}</div>
+            <div class="card-title">{competition_id}</div>
+            <a href="{rel_path}" class="card-link" target="_blank">
+                View Visualization →
+            </a>
+            <div class="card-path">{rel_path}</div>
+        </div>
+"""
+
+@lru_cache(maxsize=4096)
+def _render_card(date_run, competition_id, rel_path):
+    """
+    The card for one dashboard as a UTF-8 JSON item {html, search} for the page's viz-data
+    list; search is the lowercase text the filter box matches against. Cards depend only on
+    these path fields, so they are memoized across requests and rescans.
+    """
+    # Parse date for display
+    date_str = date_run.split('T')[0]
+    item = {
+        'html': CARD_TEMPLATE.format(date=date_str, competition_id=competition_id, rel_path=rel_path),
+        'search': f"{date_run} {competition_id} {rel_path}".lower(),
+    }
+    # "</" would end the <script> element early
+    return json.dumps(item, ensure_ascii=False).replace('</', '<\\/').encode('utf-8')
+
+def dashboard_etag(viz_files):
+    """
+    ETag for the page listing viz_files. It changes exactly when the set of cards does;
+    weak, since the page's "Generated on" time (and its gzip encoding) can differ under it.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for v in viz_files:
+        digest.update(v['rel_path'].encode('utf-8', 'surrogateescape'))
+        digest.update(b'\0')
+    return f'W/"{digest.hexdigest()}"'
+
+class DashboardHTTPHandler(http.server.SimpleHTTPRequestHandler):
+    """HTTP handler that serves dynamic dashboard."""
+    
+    # Keep-alive: a browser reuses one connection for the page and the dashboards it links to
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        """Handle GET requests."""
+        
+        # If requesting the dashboard, generate it dynamically
+        if self.path == '/hyper_dashboard.html' or self.path == '/':
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            
+            # Get the runs directory (parent of parent of this script)
+            script_dir = Path(__file__).resolve().parent
+            runs_dir = script_dir.parent / "runs"
+            
+            # Generate dashboard HTML dynamically, writing each piece as it is produced
+            self.write_dashboard(runs_dir, use_gzip)
+            return
         
-        return html
+        # For all other requests, use default handler (serve files)
+        super().do_GET()
+    
+    def send_dashboard_headers(self, use_gzip, etag, length=None, status=200):
+        """
+        Start a dashboard response. A 200's body is `length` bytes if given, otherwise
+        it is sent with chunked transfer encoding; a 304 has no body.
+        """
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        # Browsers may reuse the page as long as the server would; after that they revalidate
+        self.send_header('Cache-Control', f'max-age={int(DASHBOARD_CACHE_TTL)}, must-revalidate')
+        self.send_header('Vary', 'Accept-Encoding')
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header('Content-type', 'text/html')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        if length is None:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Content-Length', str(length))
+        self.end_headers()
+    
+    def etag_matches(self, etag):
+        """Whether the request's If-None-Match names etag (compared weakly, as If-None-Match is)."""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+        return '*' in tags or etag.removeprefix('W/') in tags
+    
+    def write_dashboard(self, runs_dir, use_gzip):
+        """
+        Write the dashboard HTML for runs_dir to the client, gzip-compressed if use_gzip.
+        Served from the cache while fresh, otherwise rendered by scanning runs_dir and
+        streamed piece by piece. A client already holding the current page gets a 304.
+        """
+        key = str(runs_dir)
+        try:
+            mtime = os.stat(runs_dir).st_mtime
+        except OSError:
+            mtime = None
+        cached = _DASHBOARD_CACHE.get(key)
+        chunks = None
+        if cached and cached["mtime"] == mtime and time.monotonic() - cached["time"] < DASHBOARD_CACHE_TTL:
+            etag = cached["etag"]
+        else:
+            viz_files = self.find_visualization_files(runs_dir)
+            etag = dashboard_etag(viz_files)
+            if cached and cached["etag"] == etag:
+                # Same cards as the cached page; only its timestamp would change
+                cached["mtime"], cached["time"] = mtime, time.monotonic()
+            else:
+                chunks = self.render_dashboard(viz_files, key, mtime, etag)
+        
+        if self.etag_matches(etag):
+            if chunks is not None:
+                # Render anyway so the page is cached for the next client without this ETag
+                for _ in chunks:
+                    pass
+            self.send_dashboard_headers(use_gzip, etag, status=304)
+            return
+        
+        if chunks is None:
+            if not use_gzip:
+                body = cached["html"]
+            else:
+                if cached["gzip"] is None:
+                    cached["gzip"] = gzip.compress(cached["html"], compresslevel=GZIP_LEVEL)
+                body = cached["gzip"]
+            self.send_dashboard_headers(use_gzip, etag, len(body))
+            self.wfile.write(body)
+            return
+        
+        # The page's length isn't known until it has been rendered, so it goes out in chunks
+        self.send_dashboard_headers(use_gzip, etag)
+        out = ChunkedWriter(self.wfile)
+        if use_gzip:
+            # Compress as the cards stream out; the repetitive card markup shrinks ~10x
+            with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=GZIP_LEVEL) as gz:
+                for chunk in chunks:
+                    gz.write(chunk)
+        else:
+            for chunk in chunks:
+                out.write(chunk)
+        out.close()
+    
+    def card_html(self, viz_file):
+        """The viz-data JSON item for viz_file's card (see _render_card)."""
+        # Use relative path for links
+        return _render_card(viz_file['date_run'], viz_file['competition_id'], viz_file['rel_path'].replace(os.sep, '/'))
+    
+    def render_dashboard(self, viz_files, key, mtime, etag):
+        """Generate dashboard HTML for viz_files, yielding it piece by piece; caches the page once complete."""
+        
+        parts = [b''.join((
+            _PROLOGUE_PRE,
+            str(len(viz_files)).encode(),
+            _PROLOGUE_MID,
+            str(len(set(v['date_run'] for v in viz_files))).encode(),
+            _PROLOGUE_POST
+        ))]
+        yield parts[0]
+        for i, v in enumerate(viz_files):
+            # Items of the viz-data JSON list
+            parts.append(self.card_html(v) if i == 0 else b',' + self.card_html(v))
+            yield parts[-1]
+        parts.append(b''.join((
+            _EPILOGUE_PRE,
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S').encode(),
+            _EPILOGUE_POST
+        )))
+        yield parts[-1]
+        
+        _DASHBOARD_CACHE[key] = {
+            "mtime": mtime, "time": time.monotonic(), "etag": etag, "html": b''.join(parts), "gzip": None
+        }
     
     def find_visualization_files(self, runs_dir):
         """Find all journal_viz_tree_dashboard.html files under runs_dir."""
         results = []
+        runs_dir = os.fspath(runs_dir)
         
         try:
-            for root, dirs, files in os.walk(runs_dir):
-                if 'journal_viz_tree_dashboard.html' in files:
-                    viz_path = os.path.join(root, 'journal_viz_tree_dashboard.html')
-                    rel_path = os.path.relpath(viz_path, runs_dir)
-                    
-                    # Extract run info from path structure
-                    parts = rel_path.split(os.sep)
-                    if len(parts) >= 3:
-                        date_run = parts[0]
-                        competition_id = parts[1]
-                        
-                        results.append({
-                            'rel_path': rel_path,
-                            'date_run': date_run,
-                            'competition_id': competition_id,
-                            'abs_path': viz_path
-                        })
+            # Shared with the other runs/ scripts; only directories changed since the
+            # last scan (by anyone) are listed again
+            for viz_path in runs_index.find_files(runs_dir, VIZ_FILENAME):
+                viz_file = self.viz_file_info(runs_dir, viz_path)
+                if viz_file:
+                    results.append(viz_file)
         except Exception as e:
             print(f"Error scanning directory: {e}")
         
+        # find_files returns paths sorted, so runs with the same date stay ordered by path
         return sorted(results, key=lambda x: x['date_run'], reverse=True)
     
-    def generate_card_html(self, viz_file):
-        """Generate a card HTML for a single visualization file."""
-        
-        # Parse date for display
-        date_str = viz_file['date_run'].split('T')[0] if 'T' in viz_file['date_run'] else viz_file['date_run']
-        
-        # Use relative path for links
-        rel_path = viz_file['rel_path'].replace(os.sep, '/')
-        
-        return f"""        <div class="card">
-            <div class="card-date">{date_str}</div>
-            <div class="card-title">{viz_file['competition_id']}</div>
-            <a href="{rel_path}" class="card-link" target="_blank">
-                View Visualization →
-            </a>
-            <div class="card-path">{rel_path}</div>
-        </div>
-"""
+    def viz_file_info(self, runs_dir, viz_path):
+        """Card data for a dashboard at viz_path, or None if it isn't under <date_run>/<competition_id>/."""
+        rel_path = os.path.relpath(viz_path, runs_dir)
+        
+        # Extract run info from path structure
+        parts = rel_path.split(os.sep)
+        if len(parts) < 3:
+            return None
+        return {
+            'rel_path': rel_path,
+            'date_run': parts[0],
+            'competition_id': parts[1],
+            'abs_path': viz_path
+        }
     
     def log_message(self, format, *args):
         """Suppress default logging."""
@@ -383,7 +629,8 @@ def main():
     print(f"\n{'='*60}\n")
     
     try:
-        with socketserver.TCPServer(("", PORT), DashboardHTTPHandler) as httpd:
+        # One thread per connection, so a rescan or a slow client doesn't hold up other requests
+        with http.server.ThreadingHTTPServer(("", PORT), DashboardHTTPHandler) as httpd:
             httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n\n✓ Server stopped.")
@@ -15,10 +15,18 @@ Usage:
     --limit N  Process only first N files
 """
 
-import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
+from json_io import dumps_indented, parse_json, write_if_changed
+from runs_index import find_files
+
+# Per-file progress lines are written to stdout in batches of this many
+PROGRESS_BATCH_LINES = 256
+
 def standardize_journal_file(journal_path, apply=False):
     """
     Standardize a single journal_with_judgements.json file to list format.
@@ -26,8 +34,8 @@ def standardize_journal_file(journal_path, apply=False):
     """
     
     try:
-        with open(journal_path, 'r') as f:
-            data = json.load(f)
+        with open(journal_path, 'rb') as f:
+            data, orjson_ok = parse_json(f.read())
     except Exception as e:
         return False, False, f"Failed to read: {e}"
     
@@ -42,8 +50,7 @@ def standardize_journal_file(journal_path, apply=False):
         
         if apply:
             try:
-                with open(journal_path, 'w') as f:
-                    json.dump(nodes, f, indent=2)
+                write_if_changed(journal_path, dumps_indented(nodes, use_orjson=orjson_ok))
                 return True, True, f"Converted dict format to list format ({len(nodes)} nodes)"
             except Exception as e:
                 return False, False, f"Failed to write: {e}"
@@ -81,7 +88,7 @@ def main():
     print(f"Scanning {runs_dir} for journal_with_judgements.json files...")
     print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}\n")
     
-    journal_files = list(runs_dir.glob("**/journal_with_judgements.json"))
+    journal_files = [Path(p) for p in find_files(runs_dir, "journal_with_judgements.json")]
     journal_files.sort()
     
     if not journal_files:
@@ -95,26 +102,37 @@ def main():
     files_changed = 0
     errors = 0
     
-    for idx, journal_path in enumerate(journal_files, 1):
-        if args.limit > 0 and idx > args.limit:
-            print(f"Stopping at limit of {args.limit}")
-            break
-        
-        rel_path = journal_path.relative_to(runs_dir)
-        
-        print(f"[{idx}/{len(journal_files)}] {rel_path}")
-        
-        success, was_changed, message = standardize_journal_file(journal_path, apply=args.apply)
-        
-        if success:
-            print(f"  ✓ {message}")
-            files_processed += 1
-            if was_changed:
-                files_changed += 1
-                total_converted += 1
-        else:
-            print(f"  ✗ {message}")
-            errors += 1
+    to_process = journal_files[:args.limit] if args.limit > 0 else journal_files
+    lines = []
+    
+    # Files are independent read/parse/write jobs; run them across cores and report in order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(
+            partial(standardize_journal_file, apply=args.apply), to_process, chunksize=16
+        )
+        for idx, (journal_path, (success, was_changed, message)) in enumerate(zip(to_process, results), 1):
+            rel_path = journal_path.relative_to(runs_dir)
+            
+            lines.append(f"[{idx}/{len(journal_files)}] {rel_path}")
+            
+            if success:
+                lines.append(f"  ✓ {message}")
+                files_processed += 1
+                if was_changed:
+                    files_changed += 1
+                    total_converted += 1
+            else:
+                lines.append(f"  ✗ {message}")
+                errors += 1
+            
+            if len(lines) >= PROGRESS_BATCH_LINES:
+                sys.stdout.write("\n".join(lines) + "\n")
+                lines.clear()
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    
+    if len(to_process) < len(journal_files):
+        print(f"Stopping at limit of {args.limit}")
     
     # Print summary
     print(f"\n{'='*60}")
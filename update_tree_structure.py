@@ -15,11 +15,57 @@ Usage:
     --limit N  Process only first N files
 """
 
-import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, groupby
 from pathlib import Path
 from collections import defaultdict
 
+from json_io import dumps_indented, loads_json, parse_json, write_if_changed
+from runs_index import find_files
+
+# Optional: pull node2parent out of journal.json without building the rest of the file
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+def load_node2parent(journal_path):
+    """
+    The top-level node2parent mapping of journal.json, or {} if there is none.
+    With ijson only that key's value is materialized; the nodes, logs and metrics
+    around it are tokenized and dropped, and reading stops once it has been found.
+    """
+    if ijson is not None:
+        try:
+            with open(journal_path, 'rb') as f:
+                return next(ijson.items(f, 'node2parent'), None) or {}
+        except Exception:
+            pass  # e.g. NaN, which ijson rejects; let the full parse decide
+    with open(journal_path, 'rb') as f:
+        journal_data = loads_json(f.read())
+    if isinstance(journal_data, dict):
+        return journal_data.get("node2parent", {})
+    return {}
+
+# Per-file progress lines are written to stdout in batches of this many
+PROGRESS_BATCH_LINES = 256
+
+# logs/ directories are handed to workers in batches of at most this many, all from one
+# run-group (date_run) directory
+GROUP_BATCH_SIZE = 16
+
+# Written to logs/ after an --apply run; holds tree_signature() of the files it left behind
+TREE_VERSION_FILE = ".tree_version"
+
+def tree_signature(journal_path, journal_judged_path):
+    """mtime and size of both journals; if neither changed since the last --apply, nothing needs updating."""
+    journal_stat = journal_path.stat()
+    judged_stat = journal_judged_path.stat()
+    return f"{journal_stat.st_mtime_ns}:{journal_stat.st_size}:{judged_stat.st_mtime_ns}:{judged_stat.st_size}"
+
 def update_journal_file(logs_dir, apply=False):
     """
     Update journal_with_judgements.json in logs_dir using node2parent from journal.json.
@@ -36,25 +82,27 @@ def update_journal_file(logs_dir, apply=False):
     if not journal_judged_path.exists():
         return False, 0, "journal_with_judgements.json not found"
     
-    # Read journal.json to get node2parent mapping
+    # Skip both parses when the files are exactly as the last --apply left them
+    version_path = logs_dir / TREE_VERSION_FILE
+    try:
+        if version_path.read_text() == tree_signature(journal_path, journal_judged_path):
+            return True, 0, "Unchanged since last update (cached)"
+    except OSError:
+        pass
+    
+    # Read node2parent mapping from journal.json
     try:
-        with open(journal_path, 'r') as f:
-            journal_data = json.load(f)
+        node2parent = load_node2parent(journal_path)
     except Exception as e:
         return False, 0, f"Failed to read journal.json: {e}"
     
-    # Extract node2parent mapping from journal.json
-    node2parent = {}
-    if isinstance(journal_data, dict):
-        node2parent = journal_data.get("node2parent", {})
-    
     if not node2parent:
         return True, 0, "No node2parent mapping found"
     
     # Read journal_with_judgements.json
     try:
-        with open(journal_judged_path, 'r') as f:
-            judged_data = json.load(f)
+        with open(journal_judged_path, 'rb') as f:
+            judged_data, orjson_ok = parse_json(f.read())
     except Exception as e:
         return False, 0, f"Failed to read journal_with_judgements.json: {e}"
     
@@ -68,21 +116,14 @@ def update_journal_file(logs_dir, apply=False):
     else:
         return False, 0, "journal_with_judgements.json has unexpected format (not a list or dict with 'nodes')"
     
-    # Build ID-to-node mapping for quick lookup
-    # Each node has an 'id' field
-    node_by_id = {}
-    for node in judged_nodes:
-        if isinstance(node, dict) and "id" in node:
-            node_by_id[node["id"]] = node
-    
-    # Build parent and children mappings from node2parent
+    # Build parent and children mappings from node2parent in one pass
     # node2parent is {child_node_id: parent_node_id, ...}
-    children_map = defaultdict(list)
-    parent_map = {}
-    
+    # Children are kept as sets: most nodes already have the right children, and comparing
+    # sets lets those skip building a sorted list at all
+    parent_map = node2parent
+    children_map = defaultdict(set)
     for child_id, parent_id in node2parent.items():
-        parent_map[child_id] = parent_id
-        children_map[parent_id].append(child_id)
+        children_map[parent_id].add(child_id)
     
     # Update nodes with correct parent and children relationships
     changes_made = 0
@@ -94,35 +135,25 @@ def update_journal_file(logs_dir, apply=False):
         node_id = node["id"]
         
         # Update parent field based on node2parent mapping
-        if node_id in parent_map:
-            new_parent = parent_map[node_id]
-            old_parent = node.get("parent")
-            
-            if old_parent != new_parent:
-                node["parent"] = new_parent
-                changes_made += 1
-        else:
-            # Root node or unmapped node - should have no parent
-            old_parent = node.get("parent")
-            if old_parent is not None:
-                node["parent"] = None
-                changes_made += 1
+        # (root or unmapped nodes should have no parent)
+        new_parent = parent_map.get(node_id)
+        if node.get("parent") != new_parent:
+            node["parent"] = new_parent
+            changes_made += 1
         
         # Update children list based on children_map
-        if node_id in children_map:
-            new_children = sorted(children_map[node_id])
-            old_children = node.get("children", [])
-            
-            if old_children != new_children:
-                node["children"] = new_children
+        old_children = node.get("children")
+        new_children = children_map.get(node_id)
+        if new_children:
+            if old_children is None or set(old_children) != new_children:
+                node["children"] = sorted(new_children)
                 changes_made += 1
-        else:
+        elif old_children:
             # No children for this node
-            if node.get("children"):
-                node["children"] = []
-                changes_made += 1
-            elif "children" not in node:
-                node["children"] = []
+            node["children"] = []
+            changes_made += 1
+        elif old_children is None:
+            node["children"] = []
     
     # Write updated data if apply flag is set
     if apply:
@@ -130,22 +161,31 @@ def update_journal_file(logs_dir, apply=False):
             # Write back in the same format as it was read
             if is_dict_format:
                 judged_data["nodes"] = judged_nodes
-                with open(journal_judged_path, 'w') as f:
-                    json.dump(judged_data, f, indent=2)
+                written = write_if_changed(journal_judged_path, dumps_indented(judged_data, use_orjson=orjson_ok))
             else:
                 # Plain list format
-                with open(journal_judged_path, 'w') as f:
-                    json.dump(judged_nodes, f, indent=2)
-            
-            return True, changes_made, f"Updated {changes_made} node relationships"
+                written = write_if_changed(journal_judged_path, dumps_indented(judged_nodes, use_orjson=orjson_ok))
         except Exception as e:
             return False, 0, f"Failed to write journal_with_judgements.json: {e}"
+        
+        try:
+            version_path.write_text(tree_signature(journal_path, journal_judged_path))
+        except OSError:
+            pass  # Only costs a full re-check next run
+        
+        if not written:
+            return True, changes_made, "No changes needed (file already up to date)"
+        return True, changes_made, f"Updated {changes_made} node relationships"
     
     if changes_made == 0:
         return True, changes_made, "No changes needed"
     else:
         return True, changes_made, f"Would update {changes_made} node relationships (dry-run)"
 
+def update_journal_group(logs_dirs, apply=False):
+    """update_journal_file for each of logs_dirs, in one worker call. Returns the list of results."""
+    return [update_journal_file(logs_dir, apply=apply) for logs_dir in logs_dirs]
+
 def main():
     import argparse
     
@@ -173,7 +213,10 @@ def main():
     print(f"Scanning {runs_dir} for journal.json files (to extract node2parent mapping)...")
     print(f"Will update corresponding journal_with_judgements.json files\n")
     
-    journal_files = list(runs_dir.glob("**/logs/journal.json"))
+    journal_files = [
+        Path(p) for p in find_files(runs_dir, "journal.json")
+        if os.path.basename(os.path.dirname(p)) == "logs"
+    ]
     
     if not journal_files:
         print("✗ No journal.json files found")
@@ -187,28 +230,46 @@ def main():
     files_processed = 0
     errors = 0
     
-    for idx, journal_path in enumerate(journal_files, 1):
-        if args.limit > 0 and idx > args.limit:
-            print(f"Stopping at limit of {args.limit}")
-            break
-        
-        logs_dir = journal_path.parent
-        rel_path = journal_path.relative_to(runs_dir)
-        
-        print(f"[{idx}/{len(journal_files)}] Processing: {journal_path}")
-        print(f"         Relative: {rel_path}")
-        
-        success, changes, message = update_journal_file(logs_dir, apply=args.apply)
-        
-        if success:
-            print(f"  ✓ {message}")
-            files_processed += 1
-            total_changes += changes
-            if changes > 0:
-                files_updated += 1
-        else:
-            print(f"  ✗ {message}")
-            errors += 1
+    to_process = journal_files[:args.limit] if args.limit > 0 else journal_files
+    lines = []
+    
+    # Each logs/ directory is an independent read/parse/write job; run them across cores
+    # and report in order. journal_files is sorted, so each run-group (runs/<date_run>/)
+    # is contiguous; batches never straddle two of them, keeping a worker's reads in one
+    # directory's neighbourhood on disk and in the dentry cache
+    batches = []
+    for _, group in groupby(to_process, key=lambda journal_path: journal_path.parent.parent.parent):
+        logs_dirs = [journal_path.parent for journal_path in group]
+        batches.extend(logs_dirs[i:i + GROUP_BATCH_SIZE] for i in range(0, len(logs_dirs), GROUP_BATCH_SIZE))
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = chain.from_iterable(
+            executor.map(partial(update_journal_group, apply=args.apply), batches)
+        )
+        for idx, (journal_path, (success, changes, message)) in enumerate(zip(to_process, results), 1):
+            rel_path = journal_path.relative_to(runs_dir)
+            
+            lines.append(f"[{idx}/{len(journal_files)}] Processing: {journal_path}")
+            lines.append(f"         Relative: {rel_path}")
+            
+            if success:
+                lines.append(f"  ✓ {message}")
+                files_processed += 1
+                total_changes += changes
+                if changes > 0:
+                    files_updated += 1
+            else:
+                lines.append(f"  ✗ {message}")
+                errors += 1
+            
+            if len(lines) >= PROGRESS_BATCH_LINES:
+                sys.stdout.write("\n".join(lines) + "\n")
+                lines.clear()
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    
+    if len(to_process) < len(journal_files):
+        print(f"Stopping at limit of {args.limit}")
     
     # Print summary
     print(f"\n{'='*60}")